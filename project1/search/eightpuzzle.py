@@ -184,20 +184,189 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+def _puzzleGeometry(side):
+    """
+      Returns the precomputed layout of a side x side puzzle, shared by
+      every SlidingPuzzleState of that size:
+
+        bits:  width of one cell in the packed integer
+        mask:  (1 << bits) - 1
+        moves: moves[cell] lists the (move, neighbourCell) pairs of a blank at cell
+        goal:  the packed goal state (the blank first, then 1, 2, ...)
+        targets: targets[cell][move] is the cell a blank at cell moves to
+    """
+    if side not in _GEOMETRIES:
+        size = side * side
+        bits = max(1, (size - 1).bit_length())
+        moves = []
+        for cell in range(size):
+            row, col = divmod(cell, side)
+            cellMoves = []
+            if row != 0: cellMoves.append(('up', cell - side))
+            if row != side - 1: cellMoves.append(('down', cell + side))
+            if col != 0: cellMoves.append(('left', cell - 1))
+            if col != side - 1: cellMoves.append(('right', cell + 1))
+            moves.append(tuple(cellMoves))
+        goal = 0
+        for cell in range(size):
+            goal |= cell << (bits * cell)
+        targets = [dict(cellMoves) for cellMoves in moves]
+        _GEOMETRIES[side] = (bits, (1 << bits) - 1, moves, goal, targets)
+    return _GEOMETRIES[side]
+
+_GEOMETRIES = {}
+
+class SlidingPuzzleState(object):
+    """
+      A side x side sliding-tile puzzle (side 3 is the eight puzzle, side 4
+    the fifteen puzzle) packed into a single integer: the tile in cell i
+    occupies bits [i * bits, (i + 1) * bits).  The blank's cell is kept
+    alongside, so a move only swaps two fields of the integer and hashing
+    and equality are those of an int.
+
+    It offers the same isGoal / legalMoves / result interface as
+    EightPuzzleState, so EightPuzzleSearchProblem accepts it unchanged.
+
+    >>> SlidingPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left').isGoal()
+    True
+    """
+    __slots__ = ('side', 'packed', 'blank')
+
+    def __init__( self, numbers, side=None ):
+        """
+        numbers: the tiles in row-major order, 0 being the blank
+        side: the number of rows; by default the square root of len(numbers)
+        """
+        if side is None:
+            side = int(round(len(numbers) ** 0.5))
+        if sorted(numbers) != range(side * side):
+            raise ValueError('not a %dx%d puzzle: %s' % (side, side, numbers))
+        bits = _puzzleGeometry(side)[0]
+        self.side = side
+        self.packed = 0
+        for cell, tile in enumerate(numbers):
+            self.packed |= tile << (bits * cell)
+        self.blank = numbers.index(0)
+
+    @classmethod
+    def fromPacked( cls, side, packed, blank ):
+        "Builds a puzzle from its packed integer and the blank's cell"
+        puzzle = cls.__new__(cls)
+        puzzle.side, puzzle.packed, puzzle.blank = side, packed, blank
+        return puzzle
+
+    def tiles( self ):
+        "Returns the tiles in row-major order, as passed to the constructor"
+        bits, mask = _puzzleGeometry(self.side)[:2]
+        packed = self.packed
+        return [(packed >> (bits * cell)) & mask for cell in range(self.side * self.side)]
+
+    def isGoal( self ):
+        return self.packed == _puzzleGeometry(self.side)[3]
+
+    def legalMoves( self ):
+        """
+        >>> SlidingPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
+        ['down', 'right']
+        """
+        return [move for move, cell in _puzzleGeometry(self.side)[2][self.blank]]
+
+    def successors( self ):
+        "Returns a (move, puzzle) pair for every legal move"
+        bits, mask, moves = _puzzleGeometry(self.side)[:3]
+        packed, blank = self.packed, self.blank
+        result = []
+        for move, cell in moves[blank]:
+            tile = (packed >> (bits * cell)) & mask
+            # The blank's field is zero, so xor moves the tile across
+            newPuzzle = self.__class__.__new__(self.__class__)
+            newPuzzle.side = self.side
+            newPuzzle.packed = packed ^ (tile << (bits * cell)) ^ (tile << (bits * blank))
+            newPuzzle.blank = cell
+            result.append((move, newPuzzle))
+        return result
+
+    def result( self, move ):
+        """
+          Returns a new puzzle with the blank moved; this puzzle is unchanged.
+        """
+        bits, mask, moves, goal, targets = _puzzleGeometry(self.side)
+        if move not in targets[self.blank]:
+            raise ValueError('Illegal move: %s' % move)
+        cell = targets[self.blank][move]
+        tile = (self.packed >> (bits * cell)) & mask
+        newPuzzle = self.__class__.__new__(self.__class__)
+        newPuzzle.side = self.side
+        newPuzzle.packed = self.packed ^ (tile << (bits * cell)) ^ (tile << (bits * self.blank))
+        newPuzzle.blank = cell
+        return newPuzzle
+
+    def __eq__( self, other ):
+        return self.packed == other.packed and self.side == other.side
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def __hash__( self ):
+        return hash(self.packed)
+
+    def __str__( self ):
+        width = len(str(self.side * self.side - 1))
+        horizontalLine = '-' * ((width + 3) * self.side + 1)
+        lines = [horizontalLine]
+        tiles = self.tiles()
+        for row in range(self.side):
+            cells = tiles[row * self.side:(row + 1) * self.side]
+            lines.append('|' + ''.join(' %*s |' % (width, tile or ' ') for tile in cells))
+            lines.append(horizontalLine)
+        return '\n'.join(lines)
+
+class PackedEightPuzzleState(SlidingPuzzleState):
+    """
+      A drop-in replacement for EightPuzzleState built on the packed
+    integer encoding: moves, hashing and equality are O(1) and no lists are
+    copied.  The cells and blankLocation attributes of EightPuzzleState are
+    still available, computed on demand.
+
+    >>> PackedEightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).blankLocation
+    (0, 1)
+    """
+    __slots__ = ()
+
+    def __init__( self, numbers ):
+        SlidingPuzzleState.__init__(self, numbers, 3)
+
+    @staticmethod
+    def fromEightPuzzle( puzzle ):
+        return PackedEightPuzzleState([number for row in puzzle.cells for number in row])
+
+    def _getCells( self ):
+        tiles = self.tiles()
+        return [tiles[0:3], tiles[3:6], tiles[6:9]]
+    cells = property(_getCells)
+
+    def _getBlankLocation( self ):
+        return divmod(self.blank, 3)
+    blankLocation = property(_getBlankLocation)
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
     """
       Implementation of a SearchProblem for the  Eight Puzzle domain
 
-      Each state is represented by an instance of an eightPuzzle.
+      Each state is represented by an instance of an eightPuzzle.  With
+      packed=True an EightPuzzleState start is converted to a
+      PackedEightPuzzleState, so the whole search runs on packed states.
     """
-    def __init__(self,puzzle):
+    def __init__(self,puzzle,packed=False):
         "Creates a new EightPuzzleSearchProblem which stores search information."
+        if packed and isinstance(puzzle, EightPuzzleState):
+            puzzle = PackedEightPuzzleState.fromEightPuzzle(puzzle)
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -209,6 +378,8 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
+        if isinstance(state, SlidingPuzzleState):
+            return [(puzzle, a, 1) for a, puzzle in state.successors()]
         succ = []
         for a in state.legalMoves():
             succ.append((state.result(a), a, 1))
@@ -250,20 +421,46 @@ def loadEightPuzzle(puzzleNumber):
     """
     return EightPuzzleState(EIGHT_PUZZLE_DATA[puzzleNumber])
 
-def createRandomEightPuzzle(moves=100):
+def createRandomEightPuzzle(moves=100, packed=False):
     """
       moves: number of random moves to apply
+      packed: return a PackedEightPuzzleState, which is much faster to
+        create; a seeded run yields the same puzzle either way
 
       Creates a random eight puzzle by applying
       a series of 'moves' random moves to a solved
       puzzle.
     """
+    if packed:
+        return PackedEightPuzzleState.fromPacked(3, *_randomWalk(3, moves))
     puzzle = EightPuzzleState([0,1,2,3,4,5,6,7,8])
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
     return puzzle
 
+def createRandomSlidingPuzzle(side=4, moves=100):
+    """
+      Like createRandomEightPuzzle, for a side x side SlidingPuzzleState.
+    """
+    return SlidingPuzzleState.fromPacked(side, *_randomWalk(side, moves))
+
+def _randomWalk(side, moves):
+    """
+      Applies 'moves' random moves to the packed goal and returns the
+    packed puzzle and its blank cell.  Moves are drawn exactly as
+    createRandomEightPuzzle draws them (random.choice over the legal moves
+    in the same order), so a seeded run yields the same puzzle.
+    """
+    bits, mask, cellMoves, packed = _puzzleGeometry(side)[:4]
+    blank = 0
+    for i in range(moves):
+        move, cell = random.choice(cellMoves[blank])
+        tile = (packed >> (bits * cell)) & mask
+        packed ^= (tile << (bits * cell)) ^ (tile << (bits * blank))
+        blank = cell
+    return packed, blank
+
 if __name__ == '__main__':
     puzzle = createRandomEightPuzzle(25)
     print('A random puzzle:')
@@ -22,7 +22,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, random
 import traceback
 import sys
 
@@ -192,14 +192,14 @@ class Grid:
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
+        "The Zobrist hash of the True cells (see ZobristKeys)"
+        keys = ZobristKeys.forBoard(self.width, self.height).cells
         h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
+        for x, column in enumerate(self.data):
+            columnKeys = keys[x]
+            for y, value in enumerate(column):
+                if value:
+                    h ^= columnKeys[y]
         return hash(h)
 
     def copy(self):
@@ -279,6 +279,224 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class BitGrid(object):
+    """
+    An immutable set of True cells on a width x height board, packed into a
+    single int where bit (x * height + y) holds cell (x,y).  It offers the
+    read-only part of the Grid interface (grid[x][y], count, asList), so it
+    can replace a Grid of food in search states, while hashing, equality and
+    removing a cell work on one int instead of walking every cell.
+    """
+    __slots__ = ('width', 'height', 'bits', '_count')
+
+    def __init__(self, width, height, bits=0, count=None):
+        self.width = width
+        self.height = height
+        self.bits = bits
+        if count is None:
+            count = bin(bits).count('1')
+        self._count = count
+
+    @staticmethod
+    def fromGrid(grid):
+        "Packs the True cells of a Grid"
+        bits = 0
+        for x, y in grid.asList():
+            bits |= 1 << (x * grid.height + y)
+        return BitGrid(grid.width, grid.height, bits)
+
+    def asGrid(self):
+        "Returns an equivalent (mutable) Grid"
+        grid = Grid(self.width, self.height)
+        for x, y in self.asList():
+            grid[x][y] = True
+        return grid
+
+    def has(self, x, y):
+        return (self.bits >> (x * self.height + y)) & 1 == 1
+
+    def without(self, x, y):
+        "Returns a BitGrid with cell (x,y) cleared; self if it was not set"
+        bit = 1 << (x * self.height + y)
+        if not self.bits & bit:
+            return self
+        return BitGrid(self.width, self.height, self.bits ^ bit, self._count - 1)
+
+    def __getitem__(self, x):
+        column = self.bits >> (x * self.height)
+        return [(column >> y) & 1 == 1 for y in range(self.height)]
+
+    def __str__(self):
+        return str(self.asGrid())
+
+    def __eq__(self, other):
+        if not isinstance(other, BitGrid): return False
+        return self.bits == other.bits and self.height == other.height
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def copy(self):
+        return self # immutable, so sharing is safe
+
+    def count(self, item=True):
+        if item:
+            return self._count
+        return self.width * self.height - self._count
+
+    def asList(self, key=True):
+        if not key:
+            return self.asGrid().asList(False)
+        cells = []
+        bits, index = self.bits, 0
+        while bits:
+            low = bits & -bits # lowest set bit, in the same x-major order as Grid.asList
+            index = low.bit_length() - 1
+            cells.append((index // self.height, index % self.height))
+            bits ^= low
+        return cells
+
+class PathChecker(object):
+    """
+    Validates and replays action sequences on a wall Grid alone, without
+    generating GameStates.  Cells are numbered x * height + y as in
+    BitGrid, so the walls are one int, a move adds a fixed offset to the
+    cell number and a wall test is a shift and a mask.  Use forWalls to
+    share one checker per wall layout.
+    """
+    __slots__ = ('walls', 'height', 'wallBits', 'offsets')
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.height = walls.height
+        self.wallBits = BitGrid.fromGrid(walls).bits
+        self.offsets = {Directions.NORTH: 1, Directions.SOUTH: -1,
+                        Directions.EAST: walls.height, Directions.WEST: -walls.height,
+                        Directions.STOP: 0}
+
+    @staticmethod
+    def forWalls(walls):
+        "Returns the checker for walls, building it the first time they are seen"
+        entry = _pathCheckers.get(id(walls))
+        if entry is None or entry.walls is not walls:
+            entry = _pathCheckers[id(walls)] = PathChecker(walls)
+        return entry
+
+    def cells(self, start, actions):
+        """
+        Returns the cell numbers visited by actions from the position start,
+        start included, or None if an action is unknown or runs into a wall.
+        """
+        offsets, wallBits = self.offsets, self.wallBits
+        cell = start[0] * self.height + start[1]
+        cells = [cell]
+        try:
+            for action in actions:
+                cell += offsets[action]
+                if (wallBits >> cell) & 1:
+                    return None
+                cells.append(cell)
+        except KeyError:
+            return None
+        return cells
+
+    def isLegal(self, start, actions):
+        return actions is not None and self.cells(start, actions) is not None
+
+    def positions(self, start, actions):
+        "Like cells, as (x,y) positions"
+        cells = self.cells(start, actions)
+        if cells is None:
+            return None
+        return [divmod(cell, self.height) for cell in cells]
+
+    def remainingFood(self, start, actions, food):
+        """
+        Returns the BitGrid of food (a BitGrid or Grid) left after following
+        actions from start, or None if the actions are illegal.
+        """
+        cells = self.cells(start, actions)
+        if cells is None:
+            return None
+        if not isinstance(food, BitGrid):
+            food = BitGrid.fromGrid(food)
+        eaten = 0
+        for cell in cells:
+            eaten |= 1 << cell
+        return BitGrid(food.width, food.height, food.bits & ~eaten)
+
+_pathCheckers = {}
+
+class ZobristKeys(object):
+    """
+    Random 64-bit keys for the cells of a width x height board.  A Zobrist
+    hash is the xor of the keys of the occupied cells, so adding or
+    removing one item updates it with a single xor.  The keys only depend
+    on the board size, so hashes are the same in every run; use forBoard
+    to share them.
+
+    cells holds the keys of food (and of any Grid), capsules those of
+    capsules, and agentKey gives the key of an agent's position, direction
+    and scared timer.
+    """
+    def __init__(self, width, height):
+        generator = random.Random(width * 65536 + height)
+        self.cells = [[generator.getrandbits(64) for y in range(height)] for x in range(width)]
+        self.capsules = [[generator.getrandbits(64) for y in range(height)] for x in range(width)]
+        self.salt = generator.getrandbits(64)
+
+    @staticmethod
+    def forBoard(width, height):
+        if (width, height) not in _zobristKeys:
+            _zobristKeys[(width, height)] = ZobristKeys(width, height)
+        return _zobristKeys[(width, height)]
+
+    def hashGrid(self, grid):
+        "The Zobrist hash of the True cells of grid"
+        gridHash = 0
+        for x, y in grid.asList():
+            gridHash ^= self.cells[x][y]
+        return gridHash
+
+    def hashCapsules(self, capsules):
+        capsuleHash = 0
+        for x, y in capsules:
+            capsuleHash ^= self.capsules[x][y]
+        return capsuleHash
+
+    def agentKey(self, agentIndex, agentState):
+        """
+        The key of an agent's configuration and scared timer.  Positions can
+        be fractional while ghosts are scared, so instead of a table the key
+        is a 64-bit mix of the packed values.
+        """
+        configuration = agentState.configuration
+        if configuration is None:
+            return 0
+        x, y = configuration.pos
+        packed = (((agentIndex * 8192 + int(x * 2)) * 8192 + int(y * 2)) * 8
+                  + _DIRECTION_CODES.get(configuration.direction, 7)) * 1024 + agentState.scaredTimer
+        return _mix64(packed ^ self.salt)
+
+    def scoreKey(self, score):
+        # not hash(score): hash(-1) == hash(-2)
+        return _mix64(int(score * 1024) ^ self.salt ^ 0x5bd1e995)
+
+def _mix64(value):
+    "The splitmix64 finalizer: spreads value over all 64 bits"
+    value &= 0xffffffffffffffff
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & 0xffffffffffffffff
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & 0xffffffffffffffff
+    return value ^ (value >> 31)
+
+_DIRECTION_CODES = {Directions.NORTH: 0, Directions.SOUTH: 1, Directions.EAST: 2,
+                    Directions.WEST: 3, Directions.STOP: 4}
+
+_zobristKeys = {}
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -373,15 +591,23 @@ class GameStateData:
     """
     def __init__( self, prevState = None ):
         """
-        Generates a new data packet by copying information from its predecessor.
+        Generates a new data packet from its predecessor.  The food, capsules
+        and AgentStates are shared with the predecessor until they change:
+        use getAgentStateForUpdate, removeFood and removeCapsule to change
+        them, never the shared objects themselves.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.numFood = prevState.numFood
+            self.foodHash = prevState.foodHash
+            self.zobrist = prevState.zobrist
+        self._ownedAgents = set()
+        self._changedAgents = []
 
         self._foodEaten = None
         self._foodAdded = None
@@ -394,6 +620,9 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._ownedAgents = set( range( len( state.agentStates ) ) )
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -407,6 +636,62 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def getAgentStateForUpdate( self, agentIndex ):
+        """
+        Returns the AgentState of agentIndex for changing in place, copying it
+        first if it is still shared with the predecessor.
+        """
+        if agentIndex not in self._ownedAgents:
+            agentState = self.agentStates[agentIndex]
+            self.zobrist ^= self._zobristKeys().agentKey( agentIndex, agentState )
+            self._changedAgents.append( agentIndex )
+            self.agentStates[agentIndex] = agentState.copy()
+            self._ownedAgents.add( agentIndex )
+        return self.agentStates[agentIndex]
+
+    def updateZobrist( self ):
+        """
+        Adds the keys of the AgentStates changed since this data was made
+        from its predecessor to zobrist; GameState.generateSuccessor calls it
+        once the rules have moved the agents.
+        """
+        keys = self._zobristKeys()
+        for agentIndex in self._changedAgents:
+            self.zobrist ^= keys.agentKey( agentIndex, self.agentStates[agentIndex] )
+        self._changedAgents = []
+
+    def _zobristKeys( self ):
+        return ZobristKeys.forBoard( self.layout.width, self.layout.height )
+
+    def removeFood( self, position ):
+        """
+        Removes the food at position, copying only the column it is in, and
+        updates numFood and foodHash.
+        """
+        x, y = position
+        key = self._zobristKeys().cells[x][y]
+        self.numFood -= 1
+        self.foodHash ^= key
+        self.zobrist ^= key
+        food = self.food.shallowCopy()
+        food.data = self.food.data[:]
+        food.data[x] = food.data[x][:]
+        food.data[x][y] = False
+        self.food = food
+
+    def removeCapsule( self, position ):
+        x, y = position
+        self.zobrist ^= self._zobristKeys().capsules[x][y]
+        self.capsules = [capsule for capsule in self.capsules if capsule != position]
+
+    def zobristHash( self ):
+        """
+        A 64-bit Zobrist hash of the food, capsules, agents and score, which is
+        the same in every run.  It is updated as the rules change the state,
+        so it costs the same on any board.
+        """
+        return self.zobrist ^ self._zobristKeys().scoreKey( self.score )
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -423,13 +708,7 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return hash( self.zobristHash() )
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -488,6 +767,7 @@ class GameStateData:
         Creates an initial game state from a layout array (see layout.py).
         """
         self.food = layout.food.copy()
+        self.numFood = self.food.count()
         self.capsules = layout.capsules[:]
         self.layout = layout
         self.score = 0
@@ -502,6 +782,12 @@ class GameStateData:
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
 
+        keys = self._zobristKeys()
+        self.foodHash = keys.hashGrid( self.food )
+        self.zobrist = self.foodHash ^ keys.hashCapsules( self.capsules )
+        for agentIndex, agentState in enumerate( self.agentStates ):
+            self.zobrist ^= keys.agentKey( agentIndex, agentState )
+
 try:
     import boinc
     _BOINC_ENABLED = True
@@ -581,6 +867,8 @@ class Game:
                 self.unmute()
                 self._agentCrash(i, quiet=True)
                 return
+            if ("setMaxStartupTime" in dir(agent)) and ("getMaxStartupTime" in dir(self.rules)):
+                agent.setMaxStartupTime(self.rules.getMaxStartupTime(i))
             if ("registerInitialState" in dir(agent)):
                 self.mute(i)
                 if self.catchExceptions:
@@ -44,6 +44,7 @@ from game import GameStateData
 from game import Game
 from game import Directions
 from game import Actions
+from game import Configuration
 from util import nearestPoint
 from util import manhattanDistance
 import util, layout
@@ -53,6 +54,47 @@ import sys, types, time, random, os
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+class ExploredStates:
+    """
+    Records the states that GameState.generateSuccessor is called on while
+    it is active.  Tracking is off unless one is active:
+
+      with ExploredStates() as explored:
+          ... generate successors ...
+      print len(explored.states), explored.count
+
+    count is the number of successors generated.  With countOnly no states
+    are kept (so nothing is hashed), and with maxStates at most that many
+    are kept.  Activating one suspends the previously active one until it
+    is left again.
+    """
+    def __init__( self, countOnly=False, maxStates=None ):
+        self.countOnly = countOnly
+        self.maxStates = maxStates
+        self.states = set()
+        self.count = 0
+        self._suspended = None
+
+    def record( self, state, successor ):
+        self.count += 1
+        if self.countOnly: return
+        if self.maxStates is None or len(self.states) + 2 <= self.maxStates:
+            self.states.add(state)
+            self.states.add(successor)
+
+    def reset( self ):
+        self.states = set()
+        self.count = 0
+
+    def __enter__( self ):
+        self._suspended = GameState.explored
+        GameState.explored = self
+        return self
+
+    def __exit__( self, *exceptionInfo ):
+        GameState.explored = self._suspended
+        self._suspended = None
+
 class GameState:
     """
     A GameState specifies the full game state, including the food, capsules,
@@ -72,11 +114,16 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable holding the active ExploredStates, if any
+    explored = None
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
+        """
+        Returns the states recorded by the active ExploredStates and clears
+        them, or an empty set if none is active.
+        """
+        if GameState.explored is None: return set()
+        tmp = GameState.explored.states
+        GameState.explored.reset()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
@@ -113,16 +160,17 @@ class GameState:
         if agentIndex == 0:
             state.data.scoreChange += -TIME_PENALTY # Penalty for waiting around
         else:
-            GhostRules.decrementTimer( state.data.agentStates[agentIndex] )
+            GhostRules.decrementTimer( state.data.getAgentStateForUpdate( agentIndex ) )
 
         # Resolve multi-agent effects
         GhostRules.checkDeath( state, agentIndex )
 
         # Book keeping
+        state.data.updateZobrist()
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.record(self, state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -175,7 +223,7 @@ class GameState:
         return self.data.capsules
 
     def getNumFood( self ):
-        return self.data.food.count()
+        return self.data.numFood
 
     def getFood(self):
         """
@@ -214,6 +262,13 @@ class GameState:
     def isWin( self ):
         return self.data._win
 
+    def getZobristHash( self ):
+        """
+        Returns a 64-bit hash of the state that is the same in every run, for
+        transposition tables (see GameStateData.zobristHash).
+        """
+        return self.data.zobristHash()
+
     #############################################
     #             Helper methods:               #
     # You shouldn't need to call these directly #
@@ -344,7 +399,7 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data.getAgentStateForUpdate( 0 )
 
         # Update Configuration
         vector = Actions.directionToVector( action, PacmanRules.PACMAN_SPEED )
@@ -363,21 +418,18 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.removeFood( position )
             state.data._foodEaten = position
-            # TODO: cache numFood?
-            numFood = state.getNumFood()
-            if numFood == 0 and not state.data._lose:
+            if state.data.numFood == 0 and not state.data._lose:
                 state.data.scoreChange += 500
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+            state.data.removeCapsule( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                state.data.getAgentStateForUpdate( index ).scaredTimer = SCARED_TIME
     consume = staticmethod( consume )
 
 class GhostRules:
@@ -406,7 +458,7 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
+        ghostState = state.data.getAgentStateForUpdate( ghostIndex )
         speed = GhostRules.GHOST_SPEED
         if ghostState.scaredTimer > 0: speed /= 2.0
         vector = Actions.directionToVector( action, speed )
@@ -415,8 +467,9 @@ class GhostRules:
 
     def decrementTimer( ghostState):
         timer = ghostState.scaredTimer
-        if timer == 1:
-            ghostState.configuration.pos = nearestPoint( ghostState.configuration.pos )
+        if timer == 1: # Configurations are shared between states, so replace it
+            configuration = ghostState.configuration
+            ghostState.configuration = Configuration( nearestPoint( configuration.pos ), configuration.direction )
         ghostState.scaredTimer = max( 0, timer - 1 )
     decrementTimer = staticmethod( decrementTimer )
 
@@ -438,9 +491,11 @@ class GhostRules:
     def collide( state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
             state.data.scoreChange += 200
+            ghostState = state.data.getAgentStateForUpdate( agentIndex )
             GhostRules.placeGhost(state, ghostState)
             ghostState.scaredTimer = 0
             # Added for first-person
+            state.data._eaten = state.data._eaten[:]
             state.data._eaten[agentIndex] = True
         else:
             if not state.data._win:
@@ -0,0 +1,198 @@
+# patternDatabase.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to
+# http://inst.eecs.berkeley.edu/~cs188/pacman/pacman.html
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Additive pattern-database heuristics for sliding-tile puzzles.
+
+The tiles are split into disjoint groups.  For each group a table holds,
+for every placement of the group's tiles, the number of moves of those
+tiles needed to bring them home when every other cell (blank or not) is
+treated as free.  A real move shifts exactly one tile, so the values of
+the different groups can be added and the sum is still admissible and
+consistent.  It dominates the Manhattan distance, which is the special
+case of one tile per group.
+
+Tables are built once by breadth-first search backwards from the goal and
+saved under PATTERN_DATABASE_DIR, so the fifteen puzzle's tables only have
+to be computed the first time.
+
+>>> from eightpuzzle import SlidingPuzzleState
+>>> patternDatabaseHeuristic(SlidingPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]))
+1
+"""
+
+import array, os, struct, tempfile
+from eightpuzzle import _puzzleGeometry
+
+# Default tile groups, keyed by the side of the puzzle.  Each group is
+# compact on the goal board, which makes its table more informative.
+DEFAULT_PARTITIONS = {
+    3: [(1, 2, 3, 4), (5, 6, 7, 8)],
+    4: [(1, 2, 3, 6, 7), (4, 5, 8, 9, 12), (10, 11, 13, 14, 15)],
+}
+
+# Directory holding saved tables; set PACMAN_PDB_CACHE to move it, or to
+# an empty string to keep tables in memory only.
+PATTERN_DATABASE_DIR = os.environ.get('PACMAN_PDB_CACHE',
+                                      os.path.join(tempfile.gettempdir(), 'pacman-pdbs'))
+
+_UNSEEN = 255
+_PDB_MAGIC = 'PMPDB001'
+_PDB_HEADER = struct.Struct('<8sII')
+
+class PatternDatabase:
+    """
+    The table of one tile group of a side x side puzzle.  A placement is
+    indexed by the cells of the group's tiles read as the digits of a base
+    side*side number (the first tile being the lowest digit), so the table
+    is a flat array('B') of (side*side) ** len(tiles) entries.
+    """
+    def __init__(self, side, tiles, table=None):
+        self.side = side
+        self.tiles = tuple(tiles)
+        self.numCells = side * side
+        if table is None:
+            table = buildPatternTable(side, self.tiles)
+        self.table = table
+
+    def lookup(self, positions):
+        "positions[tile] is the cell holding tile"
+        index = 0
+        for tile in reversed(self.tiles):
+            index = index * self.numCells + positions[tile]
+        return self.table[index]
+
+def buildPatternTable(side, tiles):
+    "Breadth-first search from the goal placement of tiles"
+    moves = _puzzleGeometry(side)[2]
+    numCells = side * side
+    neighbours = [[cell for move, cell in moves[blank]] for blank in range(numCells)]
+    weights = [numCells ** i for i in range(len(tiles))]
+    table = array.array('B', [_UNSEEN]) * (numCells ** len(tiles))
+
+    start = sum(tile * weight for tile, weight in zip(tiles, weights)) # tile t's home is cell t
+    table[start] = 0
+    layer, depth = [start], 0
+    while layer:
+        depth += 1
+        nextLayer = []
+        for index in layer:
+            positions = []
+            rest = index
+            for weight in weights:
+                rest, cell = divmod(rest, numCells)
+                positions.append(cell)
+            for cell, weight in zip(positions, weights):
+                for neighbour in neighbours[cell]:
+                    if neighbour in positions:
+                        continue
+                    successor = index + (neighbour - cell) * weight
+                    if table[successor] == _UNSEEN:
+                        table[successor] = depth
+                        nextLayer.append(successor)
+        layer = nextLayer
+    return table
+
+def getPatternDatabasePath(side, tiles):
+    "Returns where the table for tiles is saved, or None if saving is disabled"
+    if not PATTERN_DATABASE_DIR:
+        return None
+    name = 'pdb-%d-%s.bin' % (side, '-'.join([str(tile) for tile in tiles]))
+    return os.path.join(PATTERN_DATABASE_DIR, name)
+
+def savePatternDatabase(database, path):
+    """
+    Writes database to path.  The file is written under a temporary name and
+    then renamed, so concurrent readers never see a partial table.
+    """
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    handle, tempPath = tempfile.mkstemp(dir=directory)
+    try:
+        os.write(handle, _PDB_HEADER.pack(_PDB_MAGIC, database.side, len(database.tiles)))
+        os.write(handle, database.table.tostring())
+    finally:
+        os.close(handle)
+    os.chmod(tempPath, 0644) # mkstemp files are private; other users need to read it
+    try:
+        os.rename(tempPath, path)
+    except OSError:
+        os.remove(tempPath) # e.g. another process saved the same table first
+        raise
+
+def loadPatternDatabase(side, tiles, path):
+    """
+    Reads a table written by savePatternDatabase, or returns None if the
+    file is missing or does not hold the table for tiles.
+    """
+    try:
+        pdbFile = open(path, 'rb')
+    except IOError:
+        return None
+    try:
+        contents = pdbFile.read()
+    finally:
+        pdbFile.close()
+    expected = (side * side) ** len(tiles)
+    if len(contents) != _PDB_HEADER.size + expected:
+        return None
+    if _PDB_HEADER.unpack_from(contents, 0) != (_PDB_MAGIC, side, len(tiles)):
+        return None
+    table = array.array('B')
+    table.fromstring(contents[_PDB_HEADER.size:])
+    return PatternDatabase(side, tiles, table)
+
+def getPatternDatabase(side, tiles):
+    "Returns the table for tiles, loading it from disk or building it once"
+    key = (side, tuple(tiles))
+    if key not in _databases:
+        path = getPatternDatabasePath(side, tiles)
+        database = path and loadPatternDatabase(side, tiles, path)
+        if not database:
+            database = PatternDatabase(side, tiles)
+            if path:
+                try:
+                    savePatternDatabase(database, path)
+                except (IOError, OSError):
+                    pass # an unwritable cache only costs a rebuild next time
+        _databases[key] = database
+    return _databases[key]
+
+_databases = {}
+
+def defaultPartition(side):
+    "The tile groups used when a problem does not name its own"
+    if side in DEFAULT_PARTITIONS:
+        return DEFAULT_PARTITIONS[side]
+    tiles = range(1, side * side)
+    return [tuple(tiles[i:i + 4]) for i in range(0, len(tiles), 4)]
+
+def patternDatabaseHeuristic(state, problem=None):
+    """
+    Additive pattern-database heuristic for EightPuzzleState and
+    SlidingPuzzleState puzzles.  A problem may choose its own tile groups
+    by setting problem.patternPartition to a list of disjoint tuples.
+    """
+    if hasattr(state, 'tiles'):
+        tiles = state.tiles()
+    else:
+        tiles = [tile for row in state.cells for tile in row]
+    side = int(round(len(tiles) ** 0.5))
+    partition = getattr(problem, 'patternPartition', None) or defaultPartition(side)
+    positions = [0] * len(tiles)
+    for cell, tile in enumerate(tiles):
+        positions[tile] = cell
+    return sum([getPatternDatabase(side, group).lookup(positions) for group in partition])
@@ -18,6 +18,8 @@ by Pacman agents (in searchAgents.py).
 """
 
 import util
+import json
+import time
 
 
 class SearchProblem:
@@ -64,6 +66,133 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def getGoalState(self):
+        """
+        Returns the single goal state of the problem.  Only problems with an
+        explicit goal need this; it is used by the bidirectional searches.
+        """
+        util.raiseNotDefined()
+
+    def getPredecessors(self, state):
+        """
+          state: Search state
+
+        The reverse of getSuccessors, used by the bidirectional searches:
+        returns a list of triples (predecessor, action, stepCost) where
+        'action' leads from 'predecessor' to the given state at a cost of
+        'stepCost'
+        """
+        util.raiseNotDefined()
+
+
+class SearchStats:
+    """
+    Statistics of one search.  Every search function below starts a fresh
+    record with startStats, which keeps it on the problem as
+    problem.searchStats, and fills in:
+
+      algorithm       name of the search function
+      expanded        calls made to getSuccessors (or getPredecessors)
+      generated       successor triples those calls returned
+      maxFrontier     peak number of nodes waiting to be expanded
+      heuristicCalls  evaluations of the heuristic
+      heuristicTime   seconds spent in the heuristic, only measured when the
+                      problem opted in through timeHeuristic
+      successorTime   seconds spent in getSuccessors / getPredecessors
+      wallTime        seconds from the start to the end of the search
+      pathLength      number of actions returned
+      timedOut        whether a time-limited search stopped at its deadline
+    """
+    FIELDS = ['algorithm', 'expanded', 'generated', 'maxFrontier', 'heuristicCalls',
+              'heuristicTime', 'successorTime', 'wallTime', 'pathLength', 'timedOut']
+
+    def __init__(self, algorithm, timeHeuristic=False):
+        self.algorithm = algorithm
+        self.timeHeuristic = timeHeuristic
+        self.expanded, self.generated, self.maxFrontier = 0, 0, 0
+        self.heuristicCalls, self.heuristicTime = 0, 0.0
+        self.successorTime, self.wallTime = 0.0, 0.0
+        self.pathLength = None
+        self.timedOut = False
+        self.startTime = time.time()
+
+    def expand(self, successorFunction, state):
+        "Calls successorFunction(state), recording the call and its duration"
+        start = time.time()
+        successors = successorFunction(state)
+        self.successorTime += time.time() - start
+        self.expanded += 1
+        self.generated += len(successors)
+        return successors
+
+    def timed(self, heuristic):
+        """
+        Returns heuristic wrapped so that its calls are counted, and also
+        timed if timeHeuristic is set: reading the clock twice costs about
+        as much as a cheap heuristic.
+        """
+        if not self.timeHeuristic:
+            def countedHeuristic(state, problem=None):
+                self.heuristicCalls += 1
+                return heuristic(state, problem)
+            return countedHeuristic
+        def timedHeuristic(state, problem=None):
+            start = time.time()
+            value = heuristic(state, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += 1
+            return value
+        return timedHeuristic
+
+    def timedBatch(self, batch):
+        "Like timed, for a batch heuristic (see aStarSearch)"
+        if not self.timeHeuristic:
+            def countedBatchHeuristic(states, problem=None):
+                self.heuristicCalls += len(states)
+                return batch(states, problem)
+            return countedBatchHeuristic
+        def timedBatchHeuristic(states, problem=None):
+            start = time.time()
+            values = batch(states, problem)
+            self.heuristicTime += time.time() - start
+            self.heuristicCalls += len(states)
+            return values
+        return timedBatchHeuristic
+
+    def noteFrontier(self, size):
+        if size > self.maxFrontier:
+            self.maxFrontier = size
+
+    def finish(self, actions):
+        "Records the end of the search and passes its result through"
+        self.wallTime = time.time() - self.startTime
+        self.pathLength = len(actions)
+        return actions
+
+    def asDict(self):
+        return dict((field, getattr(self, field)) for field in self.FIELDS)
+
+    def toJson(self):
+        return json.dumps(self.asDict(), sort_keys=True)
+
+    def __str__(self):
+        return '\n'.join([
+            '[%s] expanded %d, generated %d, peak frontier %d' % (self.algorithm, self.expanded, self.generated, self.maxFrontier),
+            '  heuristic: %d calls in %.3fs, successors: %.3fs, total: %.3fs' % (self.heuristicCalls, self.heuristicTime, self.successorTime, self.wallTime)])
+
+def startStats(problem, algorithm):
+    "Starts a new SearchStats record for a search on problem"
+    problem.searchStats = SearchStats(algorithm, getattr(problem, 'heuristicTiming', False))
+    return problem.searchStats
+
+def timeHeuristic(problem):
+    """
+    Opts problem in to timing its heuristic: searches on it then record
+    heuristicTime in problem.searchStats.  Otherwise heuristic calls are
+    only counted.
+    """
+    problem.heuristicTiming = True
+
 
 def tinyMazeSearch(problem):
     """
@@ -76,92 +205,69 @@ def tinyMazeSearch(problem):
     return [s, s, w, s, w, w, s, w]
 
 
-def depthFirstSearch(problem):
+def graphSearch(problem, frontier, stats=None, onExpand=None):
+    """
+    Generic graph search shared by the search functions below.
 
-    parents = {} #to help tracing back
-    visited = []
-    explore = util.Stack()
-    actions = []
-    current = (problem.getStartState(), None) #(position, action)
-    explore.push(current)
-
-    while not explore.isEmpty() and not problem.isGoalState(current[0]):
-        current = explore.pop()
-        while current[0] in visited: #if the popped is visited, skip it
-            current = explore.pop()
-        if (not problem.isGoalState(current[0])): #to prevent expanding on the goal
-            visited.append(current[0])
-            neighbors = problem.getSuccessors(current[0])
-            for (state, action, cost) in neighbors:
-                if state not in visited:
-                    neighbor = (state, action)
-                    explore.push(neighbor)
-                    parents[neighbor] = current
-
-    if problem.isGoalState(current[0]):
-        while (current[0] != problem.getStartState()): #trace back
-            actions.append(current[1])
-            current = parents[current]
-
-    return actions[::-1] #return the actions in the right order
+      problem:  a SearchProblem
+      frontier: an empty util.Stack, util.Queue or util.PriorityQueueWithFunction;
+                its queuing policy decides which node is expanded next
+      stats:    the caller's SearchStats record, if it already started one
+      onExpand: called with the list of (successor, action, stepCost) triples
+                of each expansion that are about to be pushed
 
-def breadthFirstSearch(problem):
+    Frontier nodes are (state, action, parentState, pathCost) tuples.  Each
+    state is closed (and its parent pointer recorded) the first time it is
+    popped, so stale duplicates left in the frontier are simply skipped.  A
+    PriorityQueueWithFunction keyed on the state avoids those duplicates
+    altogether by lowering the priority of the queued node instead.
+    Returns the list of actions reaching a goal, or [] if there is none.
+    """
+    if stats is None:
+        stats = startStats(problem, 'graphSearch')
+    closed = set() #states already expanded, O(1) membership
+    parents = {} #state -> (parentState, action), to help tracing back
+    frontier.push((problem.getStartState(), None, None, 0))
 
-    parents = {} #to help tracing back
-    visited = []
-    explore = util.Queue()
-    actions = []
-    current = (problem.getStartState(), None) #(position, action)
-    explore.push(current)
-
-    while not explore.isEmpty() and not problem.isGoalState(current[0]):
-        current = explore.pop()
-        while current[0] in visited: #if the popped is visited, skip it
-            current = explore.pop()
-        if (not problem.isGoalState(current[0])): #to prevent expanding on the goal
-            visited.append(current[0])
-            neighbors = problem.getSuccessors(current[0])
-            for (state, action, cost) in neighbors:
-                if state not in visited:
-                    neighbor = (state, action)
-                    explore.push(neighbor)
-                    parents[neighbor] = current
-
-    if problem.isGoalState(current[0]):
-        while (current[0] != problem.getStartState()): #trace back
-            actions.append(current[1])
-            current = parents[current]
-
-    return actions[::-1] #return the actions in the right order
+    while not frontier.isEmpty():
+        stats.noteFrontier(len(frontier))
+        state, action, parent, pathCost = frontier.pop()
+        if state in closed: #if the popped is visited, skip it
+            continue
+        closed.add(state)
+        parents[state] = (parent, action)
+        if problem.isGoalState(state): #to prevent expanding on the goal
+            actions = []
+            while parents[state][0] is not None: #trace back
+                state, action = parents[state]
+                actions.append(action)
+            return stats.finish(actions[::-1]) #return the actions in the right order
+        successors = [triple for triple in stats.expand(problem.getSuccessors, state) if triple[0] not in closed]
+        if onExpand is not None:
+            onExpand(successors)
+        for (successor, stepAction, stepCost) in successors:
+            frontier.push((successor, stepAction, state, pathCost + stepCost))
 
-def uniformCostSearch(problem):
+    return stats.finish([])
 
-    parents = {} #to help tracing back
-    visited = []
-    explore = util.PriorityQueue()
-    actions = []
-    current = (problem.getStartState(), None, 0) #(state, action, cost)
-
-    explore.push(current, 0)
-    while not explore.isEmpty() and not problem.isGoalState(current[0]):
-        current = explore.pop()
-        while current[0] in visited: #if the popped is visited, skip it
-            current = explore.pop()
-        if not problem.isGoalState(current[0]): #to prevent expanding on the goal
-            visited.append(current[0])
-            neighbors = problem.getSuccessors(current[0])
-            for (state, action, cost) in neighbors:
-                if state not in visited:
-                    neighbor = (state, action, cost + current[2])
-                    explore.push((state, action, cost + current[2]), cost + current[2])
-                    parents[neighbor] = current
-
-    if problem.isGoalState(current[0]):
-        while (current[0] != problem.getStartState()): #trace back
-            actions.append(current[1])
-            current = parents[current]
-
-    return actions[::-1] #return the actions in the right order
+def depthFirstSearch(problem):
+    """
+    Search the deepest nodes in the search tree first.
+    """
+    return graphSearch(problem, util.Stack(), startStats(problem, 'depthFirstSearch'))
+
+def breadthFirstSearch(problem):
+    """
+    Search the shallowest nodes in the search tree first.
+    """
+    return graphSearch(problem, util.Queue(), startStats(problem, 'breadthFirstSearch'))
+
+def uniformCostSearch(problem):
+    """
+    Search the node of least total cost first.
+    """
+    frontier = util.PriorityQueueWithFunction(lambda node: node[3], lambda node: node[0])
+    return graphSearch(problem, frontier, startStats(problem, 'uniformCostSearch'))
 
 def nullHeuristic(state, problem=None):
     """
@@ -170,42 +276,757 @@ def nullHeuristic(state, problem=None):
     """
     return 0
 
+def cacheHeuristic(problem, maxSize=100000):
+    """
+    Opts problem in to heuristic memoization: aStarSearch will then evaluate
+    the heuristic at most once per distinct state (as long as no more than
+    maxSize states are live), keeping the values in an LRU cache stored as
+    problem.heuristicCache.  Its hits and misses counters describe the last
+    search run on the problem.
+    """
+    problem.heuristicCache = util.LRUCache(maxSize)
+    return problem.heuristicCache
+
 def aStarSearch(problem, heuristic=nullHeuristic):
     """
     Search the node that has the lowest combined cost and heuristic first.
+
+    A heuristic may also offer a batch version as its 'batch' attribute,
+    taking (states, problem) and returning the list of their values; the
+    successors of each expansion are then evaluated in one call, leaving
+    out those already in the heuristicCache, if any.  This only saves
+    work a heuristic can share between the states of a batch: the
+    successors of one expansion are at most four states in these mazes.
+    """
+    stats = startStats(problem, 'aStarSearch')
+    batch = getattr(heuristic, 'batch', None)
+    heuristic = stats.timed(heuristic)
+    cache = getattr(problem, 'heuristicCache', None)
+    onExpand, batchValues = None, {}
+    if batch is not None:
+        batch = stats.timedBatch(batch)
+        def onExpand(successors):
+            states = [successor for (successor, action, stepCost) in successors
+                      if cache is None or successor not in cache]
+            batchValues.clear()
+            if states:
+                batchValues.update(zip(states, batch(states, problem)))
+    def evaluate(state):
+        if state in batchValues:
+            return batchValues[state]
+        return heuristic(state, problem)
+
+    if cache is not None: #opted in through cacheHeuristic
+        cache.clear()
+        priority = lambda node: node[3] + cache.lookup(node[0], evaluate) #g + h
+    else:
+        priority = lambda node: node[3] + evaluate(node[0]) #g + h
+    frontier = util.PriorityQueueWithFunction(priority, lambda node: node[0])
+    return graphSearch(problem, frontier, stats, onExpand)
+
+
+def _joinPaths(forwardParents, backwardParents, meet):
+    """
+    Returns the actions from the start to meet (following forwardParents)
+    followed by the actions from meet to the goal (following backwardParents).
     """
-    parents = {} #to help tracing back
-    visited = []
-    explore = util.PriorityQueue()
     actions = []
-    current = (problem.getStartState(), None, heuristic(problem.getStartState(), problem)) #(state, action, heuristic)
-    explore.push(current, heuristic(problem.getStartState(), problem))
-
-    while not explore.isEmpty() and not problem.isGoalState(current[0]):
-        current = explore.pop()
-        while current[0] in visited: #if the popped is visited, skip it
-            current = explore.pop()
-        if not problem.isGoalState(current[0]): #to prevent expanding on the goal
-            visited.append(current[0])
-            neighbors = problem.getSuccessors(current[0])
-            for (state, action, cost) in neighbors:
-                if state not in visited:
-                    newH = heuristic(state, problem) + current[2] + cost - heuristic(current[0], problem)
-                    #heuristic of new state + stored heuristic in current + cost of path - heuristic of the previous state
-                    neighbor = (state, action, newH)
-                    explore.push((state, action, newH), newH)
-                    parents[neighbor] = current
-
-    if problem.isGoalState(current[0]):
-        while (current[0] != problem.getStartState()): #trace back
-            actions.append(current[1])
-            current = parents[current]
-
-    return actions[::-1] #return the actions in the right order
+    state = meet
+    while forwardParents[state][0] is not None: #trace back to the start
+        state, action = forwardParents[state]
+        actions.append(action)
+    actions.reverse()
+    state = meet
+    while backwardParents[state][0] is not None: #trace forward to the goal
+        action = backwardParents[state][1]
+        state = backwardParents[state][0]
+        actions.append(action)
+    return actions
+
+def bidirectionalSearch(problem):
+    """
+    Breadth-first search from the start and (through getPredecessors) from
+    the goal at the same time, expanding a whole layer of the smaller side
+    each round.  Like breadthFirstSearch it ignores step costs; each side
+    only has to reach about half the solution depth.
+    """
+    stats = startStats(problem, 'bidirectionalSearch')
+    start, goal = problem.getStartState(), problem.getGoalState()
+    parents = ({start: (None, None)}, {goal: (None, None)}) #state -> (neighbor, action)
+    layers = ([start], [goal])
+    expand = (problem.getSuccessors, problem.getPredecessors)
+    if start == goal:
+        return stats.finish([])
+
+    while layers[0] and layers[1]:
+        stats.noteFrontier(len(layers[0]) + len(layers[1]))
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        mine, other = parents[side], parents[1 - side]
+        nextLayer, best, meet = [], None, None
+        for state in layers[side]:
+            for (neighbor, action, cost) in stats.expand(expand[side], state):
+                if neighbor in mine:
+                    continue
+                # backward links point towards the goal, along the action taken
+                mine[neighbor] = (state, action)
+                nextLayer.append(neighbor)
+                if neighbor in other:
+                    length = _depth(parents[0], neighbor) + _depth(parents[1], neighbor)
+                    if best is None or length < best:
+                        best, meet = length, neighbor
+        if meet is not None: #the best meeting in a complete layer is optimal
+            return stats.finish(_joinPaths(parents[0], parents[1], meet))
+        layers = (nextLayer, layers[1]) if side == 0 else (layers[0], nextLayer)
+
+    return stats.finish([])
+
+def _depth(parents, state):
+    "Number of parent links between state and the root of its search tree"
+    depth = 0
+    while parents[state][0] is not None:
+        state = parents[state][0]
+        depth += 1
+    return depth
+
+class ReversedProblem:
+    """
+    A view of a problem with an explicit goal that runs from the goal back
+    to the start, so that heuristics written for the original problem can
+    estimate the backward distances of bidirectionalAStar.  Attributes such
+    as walls are read from the wrapped problem; goal is the original start.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.goal = problem.getStartState()
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def getStartState(self):
+        return self.problem.getGoalState()
+
+    def getGoalState(self):
+        return self.goal
+
+    def isGoalState(self, state):
+        return state == self.goal
 
+    def getSuccessors(self, state):
+        return self.problem.getPredecessors(state)
+
+    def getPredecessors(self, state):
+        return self.problem.getSuccessors(state)
+
+def bidirectionalAStar(problem, heuristic=nullHeuristic):
+    """
+    A* from the start and the goal at the same time.  Both sides use the
+    average of the forward heuristic (towards the goal) and the backward one
+    (evaluated on ReversedProblem, towards the start), which keeps them
+    consistent with each other, so the search can stop as soon as the two
+    smallest frontier keys add up to the best path found so far.  With
+    nullHeuristic this is bidirectional uniform cost search.
+    """
+    stats = startStats(problem, 'bidirectionalAStar')
+    heuristic = stats.timed(heuristic)
+    start, goal = problem.getStartState(), problem.getGoalState()
+    reverse = ReversedProblem(problem)
+    potential = lambda state: (heuristic(state, problem) - heuristic(state, reverse)) / 2.0
+    potentials = (potential, lambda state: -potential(state))
+    expand = (problem.getSuccessors, problem.getPredecessors)
+
+    costs = ({start: 0}, {goal: 0}) #best known path cost from each root
+    parents = ({start: (None, None)}, {goal: (None, None)})
+    frontiers = (util.PriorityQueue(), util.PriorityQueue())
+    frontiers[0].update(start, potentials[0](start))
+    frontiers[1].update(goal, potentials[1](goal))
+    closed = (set(), set())
+    best, meet = (0, start) if start == goal else (None, None)
+
+    while not frontiers[0].isEmpty() and not frontiers[1].isEmpty():
+        stats.noteFrontier(len(frontiers[0]) + len(frontiers[1]))
+        topKeys = [costs[i][frontiers[i].peek()] + potentials[i](frontiers[i].peek()) for i in (0, 1)]
+        if best is not None and topKeys[0] + topKeys[1] >= best:
+            break
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        state = frontiers[side].pop()
+        closed[side].add(state)
+        for (neighbor, action, cost) in stats.expand(expand[side], state):
+            if neighbor in closed[side]:
+                continue
+            newCost = costs[side][state] + cost
+            if neighbor not in costs[side] or newCost < costs[side][neighbor]:
+                costs[side][neighbor] = newCost
+                parents[side][neighbor] = (state, action)
+                frontiers[side].update(neighbor, newCost + potentials[side](neighbor))
+            if neighbor in costs[1 - side]:
+                total = costs[side][neighbor] + costs[1 - side][neighbor]
+                if best is None or total < best:
+                    best, meet = total, neighbor
+
+    if meet is None:
+        return stats.finish([])
+    return stats.finish(_joinPaths(parents[0], parents[1], meet))
+
+
+def iterativeDeepeningAStar(problem, heuristic=nullHeuristic):
+    """
+    IDA*: repeated depth-first searches, each cut off where the f-cost
+    exceeds a bound that starts at h(start) and is raised to the smallest
+    f-cost that went over it.  Only the current path is kept in memory, at
+    the price of re-expanding nodes in every iteration.
+    """
+    stats = startStats(problem, 'iterativeDeepeningAStar')
+    heuristic = stats.timed(heuristic)
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        return stats.finish([])
+    bound = heuristic(start, problem)
+    infinity = float('inf')
+
+    while bound < infinity:
+        path, actions, costs = [start], [], [0]
+        onPath = set(path) #cycle check along the current path only
+        successors = [iter(stats.expand(problem.getSuccessors, start))]
+        nextBound = infinity
+        while successors:
+            try:
+                (state, action, cost) = next(successors[-1])
+            except StopIteration: #backtrack
+                successors.pop()
+                onPath.discard(path.pop())
+                costs.pop()
+                if actions:
+                    actions.pop()
+                continue
+            if state in onPath:
+                continue
+            g = costs[-1] + cost
+            f = g + heuristic(state, problem)
+            if f > bound:
+                nextBound = min(nextBound, f)
+                continue
+            if problem.isGoalState(state):
+                return stats.finish(actions + [action])
+            path.append(state)
+            onPath.add(state)
+            actions.append(action)
+            costs.append(g)
+            successors.append(iter(stats.expand(problem.getSuccessors, state)))
+            stats.noteFrontier(len(path))
+        bound = nextBound
+
+    return stats.finish([])
+
+class SMANode:
+    """
+    A search node held in memory by smaStarSearch.  successors is filled in
+    the first time the node is expanded; pending lists the indices of those
+    successors that are not in memory (never generated, or pruned), and
+    forgotten keeps the backed-up f-costs of the pruned ones.
+    """
+
+    def __init__(self, serial, state, parent, index, action, g, f):
+        self.serial = serial #identifies the node in smaStarSearch's queues
+        self.state, self.parent, self.index, self.action = state, parent, index, action
+        self.g, self.f = g, f
+        self.depth = parent.depth + 1 if parent else 0
+        self.successors, self.pending = None, None
+        self.forgotten = {}
+        self.children = []
+        self.version = 0 #bumped whenever queued entries for this node go stale
+
+    def isOpen(self):
+        "Whether the node still has successors to generate"
+        return self.pending is None or len(self.pending) > 0
+
+    def isLeaf(self):
+        return not self.children and self.parent is not None
+
+    def onPath(self, state):
+        "Whether state is this node's or one of its ancestors'"
+        node = self
+        while node is not None:
+            if node.state == state:
+                return True
+            node = node.parent
+        return False
+
+def smaStarSearch(problem, heuristic=nullHeuristic, maxNodes=100000):
+    """
+    Simplified memory-bounded A* (SMA*): A* that never holds more than
+    maxNodes search nodes.  Successors are generated one at a time; when the
+    budget is full the shallowest leaf with the highest f-cost is pruned
+    before the new node is added, and its f-cost is remembered by its
+    parent, which will regenerate it if that part of the tree becomes the
+    most promising again.  A successor whose state is already in memory with
+    no greater path cost is dropped, as its subtree can only repeat the
+    other one's.  Returns an optimal path if one fits within maxNodes - 1
+    steps, otherwise [].
+
+    The priority queues refer to nodes by serial number through a dict of
+    the nodes in memory, so stale queue entries cannot keep pruned nodes
+    alive; the queues themselves are rebuilt when they pass 4 * maxNodes
+    entries.
+    """
+    stats = startStats(problem, 'smaStarSearch')
+    heuristic = stats.timed(heuristic)
+    infinity = float('inf')
+    start = problem.getStartState()
+    root = SMANode(0, start, None, None, None, 0, heuristic(start, problem))
+    nodes = {0: root} #serial -> node, for every node in memory
+    openNodes = util.PriorityQueue() #(serial, version), deepest least-f first
+    leaves = util.PriorityQueue() #(serial, version), shallowest highest-f first
+    cheapest = {start: root} #state -> in-memory node reaching it at the lowest g
+
+    def refresh(node):
+        node.version += 1
+        if node.isOpen():
+            openNodes.push((node.serial, node.version), (node.f, -node.depth))
+        if node.isLeaf():
+            leaves.push((node.serial, node.version), (-node.f, node.depth))
+
+    def current(entry):
+        "The node a queue entry refers to, or None if the entry is stale"
+        node = nodes.get(entry[0])
+        if node is None or node.version != entry[1]:
+            return None
+        return node
+
+    def backUp(node):
+        # once every successor's f-cost is known, a node is worth the best of them
+        while node is not None and all(i in node.forgotten for i in node.pending):
+            f = min([child.f for child in node.children] + node.forgotten.values() + [infinity])
+            if f == node.f:
+                break
+            node.f = f
+            refresh(node)
+            node = node.parent
+
+    def prune(keep):
+        while not leaves.isEmpty():
+            leaf = current(leaves.pop())
+            if leaf is not None and leaf.isLeaf() and leaf is not keep:
+                break
+        else:
+            return False
+        parent = leaf.parent
+        parent.children.remove(leaf)
+        if cheapest.get(leaf.state) is leaf:
+            del cheapest[leaf.state]
+        del nodes[leaf.serial]
+        leaf.successors, leaf.children, leaf.parent = None, [], None
+        parent.forgotten[leaf.index] = leaf.f
+        if leaf.f < infinity:
+            parent.pending.append(leaf.index)
+        refresh(parent)
+        return True
+
+    refresh(root)
+    serials = 1
+    while not openNodes.isEmpty():
+        node = current(openNodes.pop())
+        if node is None or not node.isOpen():
+            continue
+        if node.f == infinity:
+            break
+        if problem.isGoalState(node.state):
+            actions = []
+            while node.parent is not None:
+                actions.append(node.action)
+                node = node.parent
+            return stats.finish(actions[::-1])
+
+        if node.successors is None:
+            node.successors = stats.expand(problem.getSuccessors, node.state)
+            node.pending = range(len(node.successors))
+        index = node.pending.pop(0)
+        (state, action, cost) = node.successors[index]
+        g, child = node.g + cost, None
+        if state in cheapest and cheapest[state].g <= g:
+            f = infinity #dominated by a copy already in memory
+        elif node.onPath(state) or (node.depth + 1 >= maxNodes - 1 and not problem.isGoalState(state)):
+            f = infinity #cycles and paths too long to fit in memory lead nowhere
+        else:
+            f = max(node.f, g + heuristic(state, problem), node.forgotten.pop(index, 0))
+        if f < infinity and len(nodes) >= maxNodes and not prune(node):
+            node.forgotten[index] = infinity #no room: the path to it cannot fit in maxNodes
+        elif f < infinity:
+            child = SMANode(serials, state, node, index, action, g, f)
+            serials += 1
+            nodes[child.serial] = child
+            cheapest[state] = child
+            node.children.append(child)
+            stats.noteFrontier(len(nodes))
+            refresh(child)
+        else:
+            node.forgotten[index] = f
+        refresh(node)
+        backUp(node)
+        if len(openNodes) + len(leaves) > 4 * maxNodes: #drop stale queue entries
+            openNodes, leaves = util.PriorityQueue(), util.PriorityQueue()
+            for inMemory in nodes.values():
+                refresh(inMemory)
+
+    return stats.finish([])
+
+
+def jumpPointSearch(problem, heuristic=nullHeuristic):
+    """
+    Jump Point Search for problems whose states are (x,y) positions on a
+    4-connected grid with unit step costs, such as PositionSearchProblem and
+    AnyFoodSearchProblem.  Instead of calling getSuccessors it scans
+    problem.walls in straight lines and only queues the cells where a
+    shortest path may have to turn (jump points), so the A* below expands
+    far fewer nodes than ucs while returning a path of the same cost.
+
+    Among equally short paths it only follows those that make each vertical
+    move as early as possible: after a horizontal step the path may turn
+    vertically only where a wall prevented turning one cell earlier, while
+    after a vertical step it may always turn.  Each expanded jump point
+    counts towards problem._expanded.
+    """
+    from game import Actions
+    stats = startStats(problem, 'jumpPointSearch')
+    heuristic = stats.timed(heuristic)
+    walls = problem.walls
+
+    def jumpHorizontal(x, y, dx):
+        while True:
+            x += dx
+            if walls[x][y]:
+                return None
+            if problem.isGoalState((x, y)) or forcedTurns(x, y, dx):
+                return (x, y)
+
+    def jumpVertical(x, y, dy):
+        while True:
+            y += dy
+            if walls[x][y]:
+                return None
+            if problem.isGoalState((x, y)) or jumpHorizontal(x, y, 1) or jumpHorizontal(x, y, -1):
+                return (x, y)
+
+    def forcedTurns(x, y, dx):
+        # vertical moves that could not have been made one cell earlier
+        return [(0, dy) for dy in (1, -1) if walls[x - dx][y + dy] and not walls[x][y + dy]]
+
+    def directions(x, y, arrival):
+        if arrival is None:
+            return [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        dx, dy = arrival
+        if dy == 0:
+            return [arrival] + forcedTurns(x, y, dx)
+        return [arrival, (1, 0), (-1, 0)]
+
+    start = (problem.getStartState(), None) #(position, direction of the last jump)
+    costs = {start: 0}
+    parents = {start: None}
+    closed = set()
+    frontier = util.PriorityQueue()
+    frontier.update(start, heuristic(start[0], problem))
+
+    while not frontier.isEmpty():
+        stats.noteFrontier(len(frontier))
+        node = frontier.pop()
+        (x, y), arrival = node
+        if problem.isGoalState((x, y)):
+            actions = []
+            while parents[node] is not None: #trace back, one straight jump at a time
+                parent = parents[node]
+                (px, py), (dx, dy) = parent[0], node[1]
+                action = Actions.vectorToDirection((dx, dy))
+                actions.extend([action] * (abs(x - px) + abs(y - py)))
+                node, (x, y) = parent, parent[0]
+            return stats.finish(actions[::-1])
+        closed.add(node)
+        if '_expanded' in dir(problem):
+            problem._expanded += 1
+        stats.expanded += 1
+        for (dx, dy) in directions(x, y, arrival):
+            if dy == 0:
+                point = jumpHorizontal(x, y, dx)
+            else:
+                point = jumpVertical(x, y, dy)
+            if point is None:
+                continue
+            successor = (point, (dx, dy))
+            cost = costs[node] + abs(point[0] - x) + abs(point[1] - y)
+            stats.generated += 1
+            if successor not in closed and cost < costs.get(successor, cost + 1):
+                costs[successor] = cost
+                parents[successor] = node
+                frontier.update(successor, cost + heuristic(point, problem))
+
+    return stats.finish([])
+
+
+def _pathTo(parents, state):
+    "Follows parents (state -> (parentState, action), None at the root) back from state"
+    actions = []
+    while parents[state] is not None:
+        state, action = parents[state]
+        actions.append(action)
+    return actions[::-1]
+
+def anytimeWeightedAStar(problem, heuristic=nullHeuristic, weight=5.0, timeLimit=None):
+    """
+    Anytime search by restarting weighted A*.  The first pass orders nodes
+    by g + weight * h, which finds some path quickly; each later pass
+    halves (weight - 1), reuses the heuristic values computed so far and
+    prunes every node whose g + h cannot beat the best path found.  The
+    last pass runs with weight 1, i.e. A*, so given enough time the result
+    is optimal for a consistent heuristic.
+
+    timeLimit: seconds after which the best path found so far is returned.
+    If none was found yet, the path to the expanded state with the lowest
+    heuristic value is returned instead, and problem.searchStats.timedOut
+    is set either way.
+    """
+    stats = startStats(problem, 'anytimeWeightedAStar')
+    heuristic = stats.timed(heuristic)
+    deadline = timeLimit is not None and time.time() + float(timeLimit)
+    hValues = {}
+    def h(state):
+        if state not in hValues:
+            hValues[state] = heuristic(state, problem)
+        return hValues[state]
+
+    start = problem.getStartState()
+    best, bestCost = None, float('inf')
+    while True:
+        frontier = util.PriorityQueue()
+        frontier.push(start, weight * h(start))
+        costs, parents, closed = {start: 0}, {start: None}, set()
+        closest = start #lowest h expanded so far, for a partial answer
+        while not frontier.isEmpty():
+            if deadline and time.time() > deadline:
+                stats.timedOut = True
+                if best is None:
+                    best = _pathTo(parents, closest)
+                return stats.finish(best)
+            stats.noteFrontier(len(frontier))
+            state = frontier.pop()
+            closed.add(state)
+            g = costs[state]
+            if g + h(state) >= bestCost:
+                continue
+            if problem.isGoalState(state):
+                best, bestCost = _pathTo(parents, state), g
+                break
+            if h(state) < h(closest):
+                closest = state
+            for (successor, action, stepCost) in stats.expand(problem.getSuccessors, state):
+                newCost = g + stepCost
+                if (successor not in closed and newCost < costs.get(successor, newCost + 1)
+                        and newCost + h(successor) < bestCost):
+                    costs[successor] = newCost
+                    parents[successor] = (state, action)
+                    frontier.update(successor, newCost + weight * h(successor))
+        if weight == 1 or best is None: #optimal, or no path at all
+            break
+        weight = 1 + (weight - 1) / 2.0
+        if weight < 1.05:
+            weight = 1
+
+    return stats.finish(best or [])
+
+def beamSearch(problem, heuristic=nullHeuristic, beamWidth=100, timeLimit=None):
+    """
+    Breadth-first search that keeps only the beamWidth nodes with the
+    lowest g + h of each layer.  It uses bounded memory and time per layer
+    but is neither complete nor optimal: it returns the cheapest goal of
+    the first layer that holds one.
+
+    timeLimit: seconds after which the path to the state with the lowest
+    heuristic value seen in a beam is returned, and
+    problem.searchStats.timedOut is set.
+    """
+    stats = startStats(problem, 'beamSearch')
+    heuristic = stats.timed(heuristic)
+    deadline = timeLimit is not None and time.time() + float(timeLimit)
+    beamWidth = int(beamWidth)
+    start = problem.getStartState()
+    parents, costs = {start: None}, {start: 0} #for states that made it into a beam
+    beam, closest = [start], (heuristic(start, problem), start)
+
+    while beam:
+        stats.noteFrontier(len(beam))
+        for state in beam: #the beam is sorted, so this is its cheapest goal
+            if problem.isGoalState(state):
+                return stats.finish(_pathTo(parents, state))
+        candidates = {} #successor -> (cost, parent, action)
+        for state in beam:
+            if deadline and time.time() > deadline:
+                stats.timedOut = True
+                return stats.finish(_pathTo(parents, closest[1]))
+            for (successor, action, stepCost) in stats.expand(problem.getSuccessors, state):
+                cost = costs[state] + stepCost
+                if successor not in parents and cost < candidates.get(successor, (cost + 1,))[0]:
+                    candidates[successor] = (cost, state, action)
+        ranked = []
+        for order, (successor, (cost, parent, action)) in enumerate(candidates.items()):
+            hValue = heuristic(successor, problem)
+            ranked.append((cost + hValue, hValue, order, successor))
+        ranked.sort()
+        beam = []
+        for f, hValue, order, successor in ranked[:beamWidth]:
+            cost, parent, action = candidates[successor]
+            parents[successor], costs[successor] = (parent, action), cost
+            beam.append(successor)
+            if hValue < closest[0]:
+                closest = (hValue, successor)
+
+    return stats.finish([])
+
+# Strategies portfolioSearch can race: name -> (search function, whether a
+# completed run returns an optimal path, given an admissible heuristic)
+PORTFOLIO_STRATEGIES = {
+    'astar': (aStarSearch, True),
+    'ucs': (uniformCostSearch, True),
+    'bfs': (breadthFirstSearch, False),
+    'dfs': (depthFirstSearch, False),
+    'awastar': (anytimeWeightedAStar, True),
+    'beam': (beamSearch, False),
+    'idastar': (iterativeDeepeningAStar, True),
+}
+
+def portfolioSearch(problem, heuristic=nullHeuristic, strategies='astar+ucs+beam', timeLimit=None):
+    """
+    Races several search strategies, each in its own process on a copy of
+    problem, and returns the first optimal path reported.  Until one
+    arrives (or if none does before timeLimit seconds pass) the cheapest
+    path reaching a goal is kept and returned once every strategy has
+    finished or the time is up.  The other processes are then killed.
+
+      strategies: names from PORTFOLIO_STRATEGIES, as a list or joined by
+                  '+' (e.g. -a fn=portfolio,strategies=astar+beam)
+
+    Strategies that take a heuristic get this one, and those that take a
+    timeLimit get most of this one, so anytime strategies report in time.
+    The winner is recorded as problem.portfolioWinner, and its statistics
+    are copied to problem.searchStats (and its expansions to
+    problem._expanded).  Relies on fork, as on Linux and Mac OS X.
+
+    Daemonic processes, such as the multiprocessing.Pool workers of
+    searchBenchmark.py, may not start processes of their own.  There the
+    strategies take turns in the same process instead, in the order given,
+    stopping at the first optimal path.  A strategy without a timeLimit
+    then runs to the end even if the time is up.
+    """
+    import multiprocessing, Queue
+    stats = startStats(problem, 'portfolioSearch')
+    if isinstance(strategies, str):
+        strategies = strategies.split('+')
+    for name in strategies:
+        if name not in PORTFOLIO_STRATEGIES:
+            raise AttributeError, name + ' is not a portfolio strategy.'
+    deadline = timeLimit is not None and time.time() + float(timeLimit)
+    childLimit = timeLimit is not None and 0.9 * float(timeLimit)
+
+    if multiprocessing.current_process().daemon:
+        best, results = None, Queue.Queue()
+        for name in strategies:
+            if deadline and time.time() >= deadline:
+                stats.timedOut = True
+                break
+            if '_expanded' in dir(problem):
+                problem._expanded = 0
+            _runStrategy(results, name, problem, heuristic, deadline and 0.9 * (deadline - time.time()))
+            result = results.get()
+            name, actions, solved, optimal, cost, childStats, expanded = result
+            if solved and (best is None or cost < best[4]):
+                best = result
+            if solved and optimal:
+                break
+        problem.searchStats = stats
+        return _portfolioResult(problem, stats, best)
+
+    results = multiprocessing.Queue()
+    processes = []
+    for name in strategies:
+        process = multiprocessing.Process(target=_runStrategy,
+                                          args=(results, name, problem, heuristic, childLimit))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+
+    best, pending = None, len(processes)
+    try:
+        while pending > 0:
+            if deadline and time.time() >= deadline:
+                stats.timedOut = True
+                break
+            try:
+                result = results.get(timeout=0.05)
+            except Queue.Empty:
+                if not [process for process in processes if process.is_alive()] and results.empty():
+                    break #every strategy died without reporting
+                continue
+            pending -= 1
+            name, actions, solved, optimal, cost, childStats, expanded = result
+            if solved and (best is None or cost < best[4]):
+                best = result
+            if solved and optimal:
+                break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    return _portfolioResult(problem, stats, best)
+
+def _portfolioResult(problem, stats, best):
+    "Records the winning strategy's result best (or failure if None) on problem"
+    if best is None:
+        return stats.finish([])
+    name, actions, solved, optimal, cost, childStats, expanded = best
+    for field in SearchStats.FIELDS:
+        if field not in ('algorithm', 'wallTime', 'timedOut'):
+            setattr(stats, field, childStats[field])
+    stats.algorithm = 'portfolioSearch[%s]' % name
+    problem.portfolioWinner = name
+    if expanded is not None:
+        problem._expanded = expanded
+    return stats.finish(actions)
+
+def _runStrategy(results, name, problem, heuristic, timeLimit):
+    """
+    Body of one portfolioSearch process: runs the strategy name and puts
+    (name, actions, solved, optimal, cost, stats, expanded) on results.
+    """
+    function, optimal = PORTFOLIO_STRATEGIES[name]
+    options = {}
+    if 'heuristic' in function.func_code.co_varnames:
+        options['heuristic'] = heuristic
+    if timeLimit and 'timeLimit' in function.func_code.co_varnames:
+        options['timeLimit'] = timeLimit
+    try:
+        actions = function(problem, **options)
+    except Exception:
+        results.put((name, None, False, False, None, None, None))
+        return
+    expanded = getattr(problem, '_expanded', None)
+    state = problem.getStartState()
+    for action in actions: #replay, as partial paths may come back from a deadline
+        state = [successor for (successor, stepAction, stepCost) in problem.getSuccessors(state)
+                 if stepAction == action][0]
+    solved = problem.isGoalState(state)
+    timedOut = problem.searchStats.timedOut
+    results.put((name, actions, solved, optimal and solved and not timedOut,
+                 problem.getCostOfActions(actions), problem.searchStats.asDict(),
+                 expanded))
 
 # Abbreviations
 bfs = breadthFirstSearch
 dfs = depthFirstSearch
 astar = aStarSearch
-ucs = uniformCostSearch
\ No newline at end of file
+ucs = uniformCostSearch
+bibfs = bidirectionalSearch
+biastar = bidirectionalAStar
+idastar = iterativeDeepeningAStar
+smastar = smaStarSearch
+jps = jumpPointSearch
+awastar = anytimeWeightedAStar
+beam = beamSearch
+portfolio = portfolioSearch
\ No newline at end of file
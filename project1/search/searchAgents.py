@@ -38,9 +38,13 @@ Good luck and happy searching!
 from game import Directions
 from game import Agent
 from game import Actions
+from game import BitGrid
+from game import PathChecker
 import util
 import time
+import json
 import search
+import distanceCalculator
 
 
 class GoWestAgent(Agent):
@@ -62,6 +66,8 @@ class GoWestAgent(Agent):
 #       after you fill in parts of search.py          #
 #######################################################
 
+STARTUP_TIME_MARGIN = 0.2 # fraction of the startup time left for everything but the search
+
 class SearchAgent(Agent):
     """
     This very general search agent finds a path using a supplied search algorithm for a
@@ -73,20 +79,44 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    Setting heuristicCache to a number of entries memoizes the heuristic for
+    A* (see search.cacheHeuristic), e.g. -a fn=astar,heuristicCache=100000
+
+    The memory-bounded searches take a node budget through maxNodes, e.g.
+    -a fn=smastar,prob=FoodSearchProblem,heuristic=foodHeuristic,maxNodes=50000
+
+    The anytime searches take a time limit in seconds, and their own tuning
+    (weight for awastar, beamWidth for beam), e.g.
+    -a fn=awastar,prob=FoodSearchProblem,heuristic=foodHeuristic,timeLimit=5
+    Without a timeLimit they stop in time for the game's startup limit
+    (see setMaxStartupTime).  fn=portfolio races several searches, chosen
+    with strategies, e.g. -a fn=portfolio,strategies=astar+ucs+beam
+
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', heuristicCache=None,
+                 maxNodes=None, showStats=None, statsFile=None, timeLimit=None, weight=None, beamWidth=None, strategies=None):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
         if fn not in dir(search):
             raise AttributeError, fn + ' is not a search function in search.py.'
         func = getattr(search, fn)
+        options = {}
+        for name, value, convert in [('maxNodes', maxNodes, int), ('timeLimit', timeLimit, float),
+                                     ('weight', weight, float), ('beamWidth', beamWidth, int),
+                                     ('strategies', strategies, str)]:
+            if value is not None:
+                if name not in func.func_code.co_varnames:
+                    raise AttributeError, fn + ' does not take the option ' + name + '.'
+                options[name] = convert(value)
+        self.searchOptions = options
+        self.takesTimeLimit = 'timeLimit' in func.func_code.co_varnames and timeLimit is None
         if 'heuristic' not in func.func_code.co_varnames:
             print('[SearchAgent] using function ' + fn)
-            self.searchFunction = func
+            self.searchFunction = lambda x: func(x, **options)
         else:
             if heuristic in globals().keys():
                 heur = globals()[heuristic]
@@ -96,13 +126,27 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = lambda x: func(x, heuristic=heur, **options)
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
             raise AttributeError, prob + ' is not a search problem type in SearchAgents.py.'
         self.searchType = globals()[prob]
         print('[SearchAgent] using problem type ' + prob)
+        self.heuristicCacheSize = heuristicCache and int(heuristicCache)
+        self.showStats = showStats not in (None, False, 'False', '0')
+        self.statsFile = statsFile
+        self.timeHeuristic = self.showStats or bool(statsFile)
+        self.statsLabels = {'problem': prob, 'heuristic': heuristic}
+        self.maxStartupTime = None
+
+    def setMaxStartupTime(self, seconds):
+        """
+        Called by the game before registerInitialState with the time the
+        rules allow it.  Searches that take a timeLimit are then stopped
+        with STARTUP_TIME_MARGIN of that time to spare.
+        """
+        self.maxStartupTime = seconds
 
     def registerInitialState(self, state):
         """
@@ -117,10 +161,33 @@ class SearchAgent(Agent):
 
         starttime = time.time()
         problem = self.searchType(state)  # Makes a new search problem
+        self.searchProblem = problem  # Kept for callers that want its statistics
+        if getattr(self, 'heuristicCacheSize', None):
+            search.cacheHeuristic(problem, self.heuristicCacheSize)
+        if getattr(self, 'timeHeuristic', False):
+            search.timeHeuristic(problem)
+        if getattr(self, 'takesTimeLimit', False) and self.maxStartupTime:
+            remaining = self.maxStartupTime * (1 - STARTUP_TIME_MARGIN) - (time.time() - starttime)
+            self.searchOptions['timeLimit'] = max(0, remaining)
         self.actions = self.searchFunction(problem)  # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'heuristicCache' in dir(problem):
+            cache = problem.heuristicCache
+            print('Heuristic cache: %d hits, %d misses' % (cache.hits, cache.misses))
+        stats = getattr(problem, 'searchStats', None)
+        if stats is not None and stats.timedOut:
+            print('Search stopped at its time limit; using the best path found so far')
+        if 'portfolioWinner' in dir(problem): print('Portfolio winner: %s' % problem.portfolioWinner)
+        if stats is not None and getattr(self, 'showStats', False): print(stats)
+        if stats is not None and getattr(self, 'statsFile', None):
+            record = stats.asDict()
+            record.update(self.statsLabels)
+            record['cost'] = totalCost
+            statsFile = open(self.statsFile, 'a')
+            statsFile.write(json.dumps(record, sort_keys=True) + '\n')
+            statsFile.close()
 
     def getAction(self, state):
         """
@@ -220,6 +287,33 @@ class PositionSearchProblem(search.SearchProblem):
 
         return successors
 
+    def getGoalState(self):
+        return self.goal
+
+    def getPredecessors(self, state):
+        """
+        Returns the positions from which one step reaches state, as triples
+        (predecessor, action, stepCost) with 'action' leading from
+        'predecessor' to state.  Counts as an expansion like getSuccessors.
+        """
+
+        predecessors = []
+        cost = self.costFn(state)
+        for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            x, y = state
+            dx, dy = Actions.directionToVector(action)
+            prevx, prevy = int(x - dx), int(y - dy)
+            if not self.walls[prevx][prevy]:
+                predecessors.append(((prevx, prevy), action, cost))
+
+        # Bookkeeping for display purposes
+        self._expanded += 1
+        if state not in self._visited:
+            self._visited[state] = True
+            self._visitedlist.append(state)
+
+        return predecessors
+
     def getCostOfActions(self, actions):
         """
         Returns the cost of a particular sequence of actions.  If those actions
@@ -228,16 +322,10 @@ class PositionSearchProblem(search.SearchProblem):
         if actions is None:
             return 999999
 
-        x, y = self.getStartState()
-        cost = 0
-        for action in actions:
-            # Check figure out the next state and see whether its' legal
-            dx, dy = Actions.directionToVector(action)
-            x, y = int(x + dx), int(y + dy)
-            if self.walls[x][y]:
-                return 999999
-            cost += self.costFn((x, y))
-        return cost
+        positions = PathChecker.forWalls(self.walls).positions(self.getStartState(), actions)
+        if positions is None:
+            return 999999
+        return sum([self.costFn(position) for position in positions[1:]])
 
 
 class StayEastSearchAgent(SearchAgent):
@@ -285,6 +373,26 @@ def euclideanHeuristic(position, problem, info={}):
     xy2 = problem.goal
     return ((xy1[0] - xy2[0]) ** 2 + (xy1[1] - xy2[1]) ** 2) ** 0.5
 
+# The batch heuristics below evaluate the successors of one expansion in
+# one call (see search.aStarSearch), looking up the goal and tables once
+# per batch instead of once per state.  A batch holds at most four states,
+# too few for NumPy arrays to pay for their conversion, and on the
+# layouts here the searches run no measurably faster than with the
+# per-state heuristics.
+
+def manhattanHeuristicBatch(positions, problem):
+    "manhattanHeuristic for a list of positions"
+    gx, gy = problem.goal
+    return [abs(x - gx) + abs(y - gy) for x, y in positions]
+
+def euclideanHeuristicBatch(positions, problem):
+    "euclideanHeuristic for a list of positions"
+    gx, gy = problem.goal
+    return [((x - gx) ** 2 + (y - gy) ** 2) ** 0.5 for x, y in positions]
+
+manhattanHeuristic.batch = manhattanHeuristicBatch
+euclideanHeuristic.batch = euclideanHeuristicBatch
+
 
 #####################################################
 # This portion is incomplete.  Time to write code!  #
@@ -309,22 +417,18 @@ class CornersProblem(search.SearchProblem):
             if not startingGameState.hasFood(*corner):
                 print 'Warning: no food in corner ' + str(corner)
         self._expanded = 0  # Number of search nodes expanded
-        # Please add any code here which you would like to use
-        # in initializing the problem
+        # Visited corners are kept as a 4-bit mask, bit i standing for self.corners[i]
+        self.cornerBits = dict((corner, 1 << i) for i, corner in enumerate(self.corners))
+        self.heuristicInfo = {}  # A dictionary for the heuristic to store information
 
     def getStartState(self):
         "Returns the start state (in your state space, not the full Pacman state space)"
-        cornerStates = False,False,False,False
-        startState = (self.startingPosition, cornerStates) #(position, visitStatus)
+        startState = (self.startingPosition, 0) #(position, visitedCornersMask)
         return startState
 
     def isGoalState(self, state):
         "Returns whether this search state is a goal state of the problem"
-        cornerStates = state[1]
-        for cornerState in cornerStates:
-            if cornerState == False:
-                return False
-        return True
+        return state[1] == ALL_CORNERS
 
     def getSuccessors(self, state):
         # type: (object) -> object
@@ -339,7 +443,7 @@ class CornersProblem(search.SearchProblem):
         #  cost of expanding to that successor
         # """
         location = state[0]
-        cornerStates = state[1]
+        visited = state[1]
         successors = []
         for action in [Directions.EAST, Directions.WEST, Directions.NORTH, Directions.SOUTH]:
             x, y = location
@@ -347,19 +451,9 @@ class CornersProblem(search.SearchProblem):
             nextx, nexty = int(x + dx), int(y + dy)
             hitsWall = self.walls[nextx][nexty]
             if not hitsWall:
-                if (nextx, nexty) in self.corners: #if at corner, change visitStatus in state
-                    if (nextx, nexty) == self.corners[0]:
-                        visit = True, cornerStates[1], cornerStates[2], cornerStates[3]
-                    elif (nextx, nexty) == self.corners[1]:
-                        visit = cornerStates[0], True, cornerStates[2], cornerStates[3]
-                    elif (nextx, nexty) == self.corners[2]:
-                        visit = cornerStates[0], cornerStates[1], True, cornerStates[3]
-                    elif (nextx, nexty) == self.corners[3]:
-                        visit = cornerStates[0], cornerStates[1], cornerStates[2], True
-                    successor = ((nextx, nexty), visit), action, 1
-                else:
-                    successor = ((nextx, nexty), cornerStates), action, 1
-                successors.append(successor)
+                nextPosition = (nextx, nexty)
+                #if at a corner, mark it visited
+                successors.append(((nextPosition, visited | self.cornerBits.get(nextPosition, 0)), action, 1))
         self._expanded += 1
         return successors
 
@@ -368,15 +462,8 @@ class CornersProblem(search.SearchProblem):
         Returns the cost of a particular sequence of actions.  If those actions
         include an illegal move, return 999999.  This is implemented for you.
         """
-        if actions is None:
+        if not PathChecker.forWalls(self.walls).isLegal(self.startingPosition, actions):
             return 999999
-
-        x, y = self.startingPosition
-        for action in actions:
-            dx, dy = Actions.directionToVector(action)
-            x, y = int(x + dx), int(y + dy)
-            if self.walls[x][y]:
-                return 999999
         return len(actions)
 
 
@@ -400,29 +487,78 @@ def cornersHeuristic(state, problem):
         In other words, A-star would be doing a BFS for each state it expanded.
 
     Submissions with mazeDistance will receive a 0 for this question.
-    """
-    corners = problem.corners  # These are the corner coordinates
-    walls = problem.walls  # These are the walls of the maze, as a Grid (game.py)
-    top, right = walls.height - 2, walls.width - 2
-    cornerPoints = [(1,1),(1,top),(right,1),(right,top)]
-
-    dist = 0
-    cornerStates = state[1]
-    location = state[0]
-    for corner in corners:
-        if corner == cornerPoints[0]:
-            visited = cornerStates[0]
-        elif corner == cornerPoints[1]:
-            visited = cornerStates[1]
-        elif corner == cornerPoints[2]:
-            visited = cornerStates[2]
-        elif corner == cornerPoints[3]:
-            visited = cornerStates[3]
-        if not visited:
-            if dist == 0 or dist < abs(location[0] - corner[0]) + abs(location[1] - corner[1]):
-                dist = abs(location[0] - corner[0]) + abs(location[1] - corner[1])
-    #find the farthest corner and return the distance
-    return dist
+
+    This heuristic reads the layout's shared all-pairs distance table
+    (computed once per layout, not a BFS per state) and the corner tours
+    cached in problem.heuristicInfo by cornerTours.  The value is the
+    length of the shortest walk from the current position through every
+    unvisited corner, which is exact and therefore admissible and
+    consistent.  A corner that is a wall counts as UNREACHABLE, so no
+    goal can be reached and the search fails as it would without it.
+    """
+    if 'cornerTours' not in problem.heuristicInfo:
+        problem.heuristicInfo['cornerTours'] = cornerTours(problem)
+    distances, tours = problem.heuristicInfo['cornerTours']
+    position, visited = state
+    if visited == ALL_CORNERS:
+        return 0
+    best = None
+    for i, corner in enumerate(problem.corners):
+        bit = 1 << i
+        if not visited & bit:
+            if corner in distances:
+                toCorner = distances.getDistance(position, corner)
+            else:
+                toCorner = distanceCalculator.UNREACHABLE
+            cost = toCorner + tours[visited | bit][i]
+            if best is None or cost < best:
+                best = cost
+    return best
+
+ALL_CORNERS = 15 # the visited-corners mask once all four corners are reached
+
+def cornersHeuristicBatch(states, problem):
+    "cornersHeuristic for a list of states"
+    if 'cornerTours' not in problem.heuristicInfo:
+        problem.heuristicInfo['cornerTours'] = cornerTours(problem)
+    distances, tours = problem.heuristicInfo['cornerTours']
+    corners = [(1 << i, corner, corner in distances) for i, corner in enumerate(problem.corners)]
+    values = []
+    for position, visited in states:
+        best = 0 if visited == ALL_CORNERS else None
+        for i, (bit, corner, reachable) in enumerate(corners):
+            if not visited & bit:
+                toCorner = distances.getDistance(position, corner) if reachable else distanceCalculator.UNREACHABLE
+                cost = toCorner + tours[visited | bit][i]
+                if best is None or cost < best:
+                    best = cost
+        values.append(best)
+    return values
+
+cornersHeuristic.batch = cornersHeuristicBatch
+
+def cornerTours(problem):
+    """
+    Precomputes what cornersHeuristic needs for a CornersProblem and
+    returns (distances, tours): the layout's MazeDistances, and a table
+    where tours[visited][i] is the shortest walk that starts at corner i
+    and reaches every corner missing from the mask visited.  tours is
+    filled by dynamic programming over the 16 masks, from the full mask
+    down.
+    """
+    distances = distanceCalculator.getMazeDistances(problem.walls)
+    corners = problem.corners
+    between = [[distanceCalculator.UNREACHABLE] * 4 for i in range(4)]
+    for i in range(4):
+        for j in range(4):
+            if corners[i] in distances and corners[j] in distances:
+                between[i][j] = distances.getDistance(corners[i], corners[j])
+    tours = [[0] * 4 for visited in range(ALL_CORNERS + 1)]
+    for visited in range(ALL_CORNERS - 1, -1, -1):
+        for i in range(4):
+            tours[visited][i] = min([between[i][j] + tours[visited | (1 << j)][j]
+                                     for j in range(4) if not visited & (1 << j)])
+    return distances, tours
 
 
 
@@ -443,11 +579,12 @@ class FoodSearchProblem:
 
     A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
       pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-      foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food
+      foodGrid:       a BitGrid (see game.py) of the remaining food; it reads like a
+                      Grid of True or False but is immutable and cheap to hash
     """
 
     def __init__(self, startingGameState):
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), BitGrid.fromGrid(startingGameState.getFood()))
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self._expanded = 0
@@ -471,8 +608,7 @@ class FoodSearchProblem:
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood = state[1].without(nextx, nexty)
                 successors.append((((nextx, nexty), nextFood), direction, 1))
         return successors
 
@@ -481,16 +617,9 @@ class FoodSearchProblem:
         Returns the cost of a particular sequence of actions.
         If those actions include an illegal move, return 999999
         """
-        x, y = self.getStartState()[0]
-        cost = 0
-        for action in actions:
-            # figure out the next state and see whether it's legal
-            dx, dy = Actions.directionToVector(action)
-            x, y = int(x + dx), int(y + dy)
-            if self.walls[x][y]:
-                return 999999
-            cost += 1
-        return cost
+        if not PathChecker.forWalls(self.walls).isLegal(self.getStartState()[0], actions):
+            return 999999
+        return len(actions)
 
 
 class AStarFoodSearchAgent(SearchAgent):
@@ -516,7 +645,7 @@ def foodHeuristic(state, problem):
     inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
 
     The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a
-    Grid (see game.py) of either True or False. You can call foodGrid.asList()
+    BitGrid (see game.py) of either True or False. You can call foodGrid.asList()
     to get a list of food coordinates instead.
 
     If you want access to info like walls, capsules, etc., you can query the problem.
@@ -535,40 +664,149 @@ def foodHeuristic(state, problem):
         In other words, A-star would be doing a BFS for each state it expanded.
 
     Submissions with mazeDistance will receive a 0 for this question.
+
+    This heuristic is the maze distance to the nearest dot plus the weight
+    of a minimum spanning tree over the remaining dots, with both read from
+    the layout's shared all-pairs distance table (computed once per layout,
+    not a BFS per state).  Every remaining dot must be reached, and the
+    walk that reaches them all is at least as long as the spanning tree, so
+    the value is admissible; it drops by at most one per step, so it is
+    consistent.  The trees are kept in a FoodSpanningTrees stored in
+    problem.heuristicInfo.
     """
     position, foodGrid = state
-    walls = problem.walls
-    foodList = foodGrid.asList()
-
-    dist = 0
-    current = position
-    for food in foodList:
-        if dist > 0:
-            dist -= 1
-        if (current[0] == food[0]):
-            #if there is a wall in between the path add 2 to the expected length
-            if (food[1] < current[1]):
-                for i in range(food[1], current[1]):
-                    if walls[current[0]][i]:
-                        dist += 2
-            elif (food[1] > current[1]):
-                for i in range(current[1], food[1]):
-                    if walls[current[0]][i]:
-                        dist += 2
-        elif (current[1] == food[1]):
-            if (food[0] < current[0]):
-                for i in range(food[0], current[0]):
-                    if walls[i][current[1]]:
-                        dist += 2
-            elif (food[0] > current[0]):
-                for i in range(current[0], food[0]):
-                    if walls[i][current[1]]:
-                        dist += 2
-
-        dist += abs(current[0] - food[0]) + abs(current[1] - food[1])
-        #add up all the distance between food dots
-        current = food #moving to the next food
-    return dist
+    if foodGrid.count() == 0:
+        return 0
+    if 'foodTrees' not in problem.heuristicInfo:
+        problem.heuristicInfo['foodTrees'] = FoodSpanningTrees(problem.walls, problem.getStartState()[1])
+    trees = problem.heuristicInfo['foodTrees']
+    return trees.nearestDot(position, foodGrid) + trees.treeWeight(foodGrid, position)
+
+def foodHeuristicBatch(states, problem):
+    """
+    foodHeuristic for a list of states.  Successors that eat no dot share
+    their food grid, so each distinct grid's tree is looked up once.
+    """
+    if 'foodTrees' not in problem.heuristicInfo:
+        problem.heuristicInfo['foodTrees'] = FoodSpanningTrees(problem.walls, problem.getStartState()[1])
+    trees = problem.heuristicInfo['foodTrees']
+    weights = {}
+    values = []
+    for position, foodGrid in states:
+        if foodGrid.count() == 0:
+            values.append(0)
+            continue
+        if foodGrid.bits not in weights:
+            weights[foodGrid.bits] = trees.treeWeight(foodGrid, position)
+        values.append(trees.nearestDot(position, foodGrid) + weights[foodGrid.bits])
+    return values
+
+foodHeuristic.batch = foodHeuristicBatch
+
+class FoodSpanningTrees:
+    """
+    Minimum spanning trees over subsets of a problem's starting dots,
+    memoized by the food bitmask (BitGrid.bits).
+
+    Dots are numbered in the order of the starting food's asList().  A tree
+    is stored as (weight, edges) with edges a list of (i, j, distance).
+    Since A* reaches a food set by eating one dot of its parent's set, a
+    missing tree is usually derived from the parent's tree: removing dot d
+    leaves the other tree edges in place, and only the pieces d held
+    together have to be reconnected, by the cheapest edges between them.
+    Trees with no known parent are built by Prim's algorithm.
+    """
+    def __init__(self, walls, food):
+        self.distances = distanceCalculator.getMazeDistances(walls)
+        self.height = food.height
+        self.dots = food.asList()
+        self.dotIds = dict((dot, i) for i, dot in enumerate(self.dots))
+        self.between = [[self.distances.getDistance(a, b) for b in self.dots] for a in self.dots]
+        self.trees = {}
+        self.byDistance = {} #position -> [(distance, dot)] sorted, for nearestDot
+        self.rebuilt = self.derived = 0
+
+    def nearestDot(self, position, food):
+        "The maze distance from position to the closest dot of food"
+        if position not in self.byDistance:
+            self.byDistance[position] = sorted([(self.distances.getDistance(position, dot), dot)
+                                                for dot in self.dots])
+        for distance, (x, y) in self.byDistance[position]:
+            if food.has(x, y):
+                return distance
+        return 0
+
+    def treeWeight(self, food, position=None):
+        """
+        The weight of the minimum spanning tree over food.  position, the
+        cell Pacman just moved to, names the dot most likely just eaten.
+        """
+        tree = self.trees.get(food.bits)
+        if tree is None:
+            eaten = self.dotIds.get(position)
+            parent = None
+            if eaten is not None:
+                parent = self.trees.get(food.bits | (1 << (position[0] * self.height + position[1])))
+            if parent is not None and eaten is not None and not food.has(*position):
+                tree = self._withoutDot(parent, eaten)
+                self.derived += 1
+            else:
+                tree = self._prim([self.dotIds[dot] for dot in food.asList()])
+                self.rebuilt += 1
+            self.trees[food.bits] = tree
+        return tree[0]
+
+    def _prim(self, ids):
+        "Builds the tree over the dots ids from scratch"
+        if not ids:
+            return (0, [])
+        between = self.between
+        first, rest = ids[0], ids[1:]
+        best = dict((i, (between[first][i], first)) for i in rest)
+        weight, edges = 0, []
+        while best:
+            i = min(best, key=lambda other: best[other][0])
+            distance, j = best.pop(i)
+            weight += distance
+            edges.append((i, j, distance))
+            for other in best:
+                if between[i][other] < best[other][0]:
+                    best[other] = (between[i][other], i)
+        return (weight, edges)
+
+    def _withoutDot(self, tree, removed):
+        "Derives the tree without dot removed from its parent's tree"
+        weight, edges = tree
+        kept = [edge for edge in edges if removed not in edge[:2]]
+        if len(edges) - len(kept) <= 1: #a leaf: the rest of the tree stays optimal
+            return (weight - sum([edge[2] for edge in edges if removed in edge[:2]]), kept)
+
+        root = {}
+        def find(i):
+            while root.get(i, i) != i:
+                i = root[i]
+            return i
+        for i, j, distance in kept:
+            root[find(i)] = find(j)
+        pieces = {}
+        for i in set([i for edge in edges for i in edge[:2]]):
+            if i != removed:
+                pieces.setdefault(find(i), []).append(i)
+
+        # Cheapest edge between each pair of pieces, then Kruskal over them
+        pieces = pieces.values()
+        candidates = []
+        for a in range(len(pieces)):
+            for b in range(a + 1, len(pieces)):
+                candidates.append(min([(self.between[i][j], i, j) for i in pieces[a] for j in pieces[b]]))
+        candidates.sort()
+        weight = sum([edge[2] for edge in kept])
+        for distance, i, j in candidates:
+            if find(i) != find(j):
+                root[find(i)] = find(j)
+                weight += distance
+                kept.append((i, j, distance))
+        return (weight, kept)
 
 class ClosestDotSearchAgent(SearchAgent):
     """
@@ -576,52 +814,101 @@ class ClosestDotSearchAgent(SearchAgent):
     """
 
     def registerInitialState(self, state):
-        self.actions = []
-        currentState = state
-        while currentState.getFood().count() > 0:
-            nextPathSegment = self.findPathToClosestDot(currentState)  # The missing piece
-            self.actions += nextPathSegment
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-                if action not in legal:
-                    t = (str(action), str(currentState))
-                    raise Exception, 'findPathToClosestDot returned an illegal move: %s!\n%s' % t
-                currentState = currentState.generateSuccessor(0, action)
+        # The whole greedy tour is planned on cell numbers and a food list,
+        # without generating a GameState per step
+        finder = self.getDotFinder(state.getWalls())
+        self.actions = finder.tour(state.getPacmanPosition(), state.getFood())
         self.actionIndex = 0
         print 'Path found with cost %d.' % len(self.actions)
 
     def findPathToClosestDot(self, gameState):
-        #a short bfs to find the closest food
-        startPosition = gameState.getPacmanPosition()
-        problem = AnyFoodSearchProblem(gameState)
+        "Returns the actions of a shortest path from Pacman to the closest dot"
+        finder = self.getDotFinder(gameState.getWalls())
+        food = gameState.getFood()
+        hasFood = [food[x][y] for x, y in finder.cells]
+        actions, dot = finder.pathToNearest(finder.cellIds[gameState.getPacmanPosition()], hasFood)
+        return actions
+
+    def getDotFinder(self, walls):
+        "Returns the ClosestDotFinder for walls, built once per layout"
+        if getattr(self, 'dotFinder', None) is None or self.dotFinder.walls is not walls:
+            self.dotFinder = ClosestDotFinder(walls)
+        return self.dotFinder
+
+class ClosestDotFinder:
+    """
+    The open cells of a layout, numbered once, with each cell's neighbours
+    listed in the order PositionSearchProblem generates successors.  Each
+    query is still a fresh breadth-first search from Pacman's cell, but one
+    over plain lists that stops at the first dot, so it only touches the
+    cells nearer than that dot.  The visited marks are generation stamps,
+    so nothing has to be cleared between searches.  Nothing else carries
+    over from one query to the next: a tour through every dot costs up to
+    O(food * cells), with no GameState or search problem built per step.
+
+    Ties are broken exactly as a breadth-first search on an
+    AnyFoodSearchProblem breaks them, so tours match the original agent's.
+    """
+    def __init__(self, walls):
+        self.walls = walls
+        self.cells = walls.asList(False)
+        self.cellIds = dict((cell, i) for i, cell in enumerate(self.cells))
+        self.neighbors = []
+        for x, y in self.cells:
+            adjacent = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(action)
+                nextCell = (int(x + dx), int(y + dy))
+                if nextCell in self.cellIds:
+                    adjacent.append((self.cellIds[nextCell], action))
+            self.neighbors.append(adjacent)
+        n = len(self.cells)
+        self.stamps, self.generation = [0] * n, 0
+        self.parents, self.parentActions = [0] * n, [None] * n
+
+    def pathToNearest(self, start, hasFood):
+        """
+        start: the number of Pacman's cell
+        hasFood: hasFood[i] is whether cell i holds a dot
 
-        parents = {}
-        visited = []
-        explore = util.Queue()
+        Returns (actions, dot) for the closest dot, or ([], None) if no dot
+        can be reached.
+        """
+        self.generation += 1
+        generation, stamps, parents, parentActions = self.generation, self.stamps, self.parents, self.parentActions
+        stamps[start] = generation
+        frontier = [start]
+        for cell in frontier: # frontier grows while we walk it, giving BFS order
+            if hasFood[cell]:
+                actions, dot = [], cell
+                while cell != start:
+                    actions.append(parentActions[cell])
+                    cell = parents[cell]
+                return actions[::-1], dot
+            for nextCell, action in self.neighbors[cell]:
+                if stamps[nextCell] != generation:
+                    stamps[nextCell] = generation
+                    parents[nextCell] = cell
+                    parentActions[nextCell] = action
+                    frontier.append(nextCell)
+        return [], None
+
+    def tour(self, position, food):
+        "The actions of the greedy closest-dot tour from position through food"
+        hasFood = [food[x][y] for x, y in self.cells]
+        remaining = hasFood.count(True)
+        current = self.cellIds[position]
         actions = []
-        current = (startPosition, None)
-        explore.push(current)
-        while not explore.isEmpty() and not problem.isGoalState(current[0]):
-            current = explore.pop()
-            while current[0] in visited:
-                current = explore.pop()
-            if (not problem.isGoalState(current[0])):
-                visited.append(current[0])
-                neighbors = problem.getSuccessors(current[0])
-                for (state, action, cost) in neighbors:
-                    if state not in visited:
-                        neighbor = (state, action)
-                        explore.push(neighbor)
-                        parents[neighbor] = current
-        if problem.isGoalState(current[0]):
-            while (current[0] != problem.getStartState()):
-                actions.append(current[1])
-                current = parents[current]
-
-        return actions[::-1]
-
-
-
+        while remaining > 0:
+            path, dot = self.pathToNearest(current, hasFood)
+            if dot is None:
+                print 'Warning: %d dots cannot be reached' % remaining
+                break
+            actions += path
+            hasFood[dot] = False
+            remaining -= 1
+            current = dot
+        return actions
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -683,9 +970,9 @@ class ApproximateSearchAgent(Agent):
 
 def mazeDistance(point1, point2, gameState):
     """
-    Returns the maze distance between any two points, using the search functions
-    you have already built.  The gameState can be any game state -- Pacman's position
-    in that state is ignored.
+    Returns the maze distance between any two points, looked up in the all-pairs
+    table that distanceCalculator builds once per layout.  The gameState can be any
+    game state -- Pacman's position in that state is ignored.
 
     Example usage: mazeDistance( (2,4), (5,6), gameState)
 
@@ -696,5 +983,4 @@ def mazeDistance(point1, point2, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + point1
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return len(search.bfs(prob))
+    return distanceCalculator.getMazeDistances(walls).getDistance(point1, point2)
@@ -0,0 +1,142 @@
+# searchBenchmark.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to
+# http://inst.eecs.berkeley.edu/~cs188/pacman/pacman.html
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Runs SearchAgent configurations over many layouts, without a display,
+and writes one row per (layout, configuration) with the path cost, the
+search statistics and the time taken.
+
+Each configuration is given like pacman.py's -a option for SearchAgent,
+and the runs are spread over a multiprocessing pool:
+
+  python searchBenchmark.py -l '*Maze' -a fn=bfs -a fn=astar,heuristic=manhattanHeuristic
+  python searchBenchmark.py -l '*Corners' -a fn=astar,prob=CornersProblem,heuristic=cornersHeuristic -o corners.json
+"""
+
+import csv, fnmatch, json, os, sys, time
+import multiprocessing
+from StringIO import StringIO
+
+import layout
+import pacman
+import searchAgents
+
+LAYOUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts')
+
+COLUMNS = ['layout', 'agentArgs', 'fn', 'prob', 'heuristic', 'cost', 'pathLength', 'expanded',
+           'generated', 'maxFrontier', 'heuristicCalls', 'heuristicTime', 'time', 'error']
+
+def findLayouts(patterns):
+    """
+    Returns the layout names matching any of the comma separated
+    patterns (such as 'tinyMaze,*Corners'), in the order given.
+    """
+    available = sorted([name[:-len('.lay')] for name in os.listdir(LAYOUT_DIR) if name.endswith('.lay')])
+    names = []
+    for pattern in patterns.split(','):
+        matches = fnmatch.filter(available, pattern)
+        if not matches:
+            raise Exception('No layout matches ' + pattern)
+        names += [name for name in matches if name not in names]
+    return names
+
+def solve(job):
+    """
+    Runs one (layoutName, agentArgs) job and returns its row.  Output
+    printed by the agent is discarded, and errors are reported in the row
+    instead of stopping the batch.
+    """
+    layoutName, agentArgs = job
+    opts = pacman.parseAgentArgs(agentArgs)
+    row = {'layout': layoutName, 'agentArgs': agentArgs, 'fn': opts.get('fn', 'depthFirstSearch'),
+           'prob': opts.get('prob', 'PositionSearchProblem'), 'heuristic': opts.get('heuristic', '')}
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        try:
+            state = pacman.GameState()
+            state.initialize(layout.tryToLoad(os.path.join(LAYOUT_DIR, layoutName + '.lay')), 0)
+            agent = searchAgents.SearchAgent(**opts)
+            agent.timeHeuristic = True # heuristicTime is one of the columns
+            start = time.time()
+            agent.registerInitialState(state)
+            row['time'] = time.time() - start
+            problem = agent.searchProblem
+            row['cost'] = problem.getCostOfActions(agent.actions)
+            stats = getattr(problem, 'searchStats', None)
+            if stats is not None:
+                for field in COLUMNS:
+                    if field in stats.FIELDS:
+                        row[field] = getattr(stats, field)
+            if '_expanded' in dir(problem):
+                row['expanded'] = problem._expanded
+        except Exception, e:
+            row['error'] = '%s: %s' % (type(e).__name__, e)
+    finally:
+        sys.stdout = stdout
+    return row
+
+def runBatch(layoutNames, configurations, processes=None):
+    "Solves every layout with every configuration and returns the rows in that order"
+    jobs = [(name, agentArgs) for name in layoutNames for agentArgs in configurations]
+    if processes == 1:
+        return map(solve, jobs)
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(solve, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+def writeRows(rows, out, format):
+    if format == 'json':
+        json.dump([dict((field, row.get(field)) for field in COLUMNS) for row in rows],
+                  out, indent=2, sort_keys=True)
+        out.write('\n')
+    else:
+        writer = csv.DictWriter(out, COLUMNS, restval='', lineterminator='\n')
+        writer.writerow(dict((field, field) for field in COLUMNS))
+        writer.writerows(rows)
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser(__doc__.strip().split('\n\n')[-1])
+    parser.add_option('-l', '--layouts', dest='layouts', metavar='PATTERNS',
+                      help='comma separated layout names or patterns [Default: %default]',
+                      default='tinyMaze,smallMaze,mediumMaze,bigMaze')
+    parser.add_option('-a', '--agentArgs', dest='configurations', action='append', metavar='ARGS',
+                      help='SearchAgent arguments as for pacman.py -a; repeat to compare several [Default: fn=bfs]')
+    parser.add_option('-j', '--jobs', dest='jobs', type='int', metavar='N',
+                      help='number of worker processes [Default: one per CPU]', default=None)
+    parser.add_option('-o', '--output', dest='output', metavar='FILE',
+                      help='write the table to FILE instead of standard output', default=None)
+    parser.add_option('-f', '--format', dest='format', choices=['csv', 'json'],
+                      help='csv or json [Default: from the output file name, else csv]', default=None)
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if options.format is None:
+        options.format = 'json' if options.output and options.output.endswith('.json') else 'csv'
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    rows = runBatch(findLayouts(options.layouts), options.configurations or ['fn=bfs'], options.jobs)
+    if options.output:
+        out = open(options.output, 'w')
+        writeRows(rows, out, options.format)
+        out.close()
+    else:
+        writeRows(rows, sys.stdout, options.format)
@@ -269,6 +269,7 @@ class PacmanSearchTest(testClasses.TestCase):
         self.costFn = eval(testDict.get('costFn', 'None'))
         self.searchProblemClassName = testDict.get('searchProblemClass', 'PositionSearchProblem')
         self.heuristicName = testDict.get('heuristic', None)
+        self.algorithmOptions = eval(testDict.get('algorithmOptions', '{}'))
         
 
     def getSolInfo(self, search, searchAgents):
@@ -285,9 +286,9 @@ class PacmanSearchTest(testClasses.TestCase):
         heuristic = getattr(searchAgents, self.heuristicName) if self.heuristicName != None else None
         
         if heuristic != None:
-            solution = alg(problem, heuristic)
+            solution = alg(problem, heuristic, **self.algorithmOptions)
         else:
-            solution = alg(problem)
+            solution = alg(problem, **self.algorithmOptions)
         
         if type(solution) != type([]):
             return None, None, 'The result of %s must be a list. (Instead, it is %s)' % (self.alg, type(solution))
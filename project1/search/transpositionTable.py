@@ -0,0 +1,166 @@
+# transpositionTable.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to
+# http://inst.eecs.berkeley.edu/~cs188/pacman/pacman.html
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Transposition tables for game-tree search over GameStates.
+
+Minimax-style agents reach the same position through different move
+orders, and again on the next call to getAction.  A TranspositionTable
+remembers, for each position searched, the depth it was searched to, the
+value found, whether that value is exact or only a bound (after an
+alpha-beta cutoff), and the best move, so the work can be reused:
+
+  table = TranspositionTable()
+  ...
+  key = stateKey(gameState, agentIndex)
+  value = table.lookup(key, depth, alpha, beta)
+  if value is not None: return value
+  ... search, trying table.bestMove(key) first ...
+  table.store(key, depth, value, bound, bestMove)
+
+The table holds a fixed number of slots fitting memoryBudget bytes, and
+each key maps to one slot.  Call newSearch at the start of each getAction
+so entries from earlier moves are replaced before current ones.
+"""
+
+import random
+
+# Bound types
+EXACT = 'exact'
+LOWER_BOUND = 'lower' # the value is at least the stored value (a beta cutoff)
+UPPER_BOUND = 'upper' # the value is at most the stored value (no move raised alpha)
+
+# Rough size of one slot in bytes: the entry, its key and value, and the
+# list pointer to it
+ENTRY_BYTES = 200
+
+_agentKeys = []
+
+def stateKey(gameState, agentIndex=0):
+    """
+    The table key of gameState with agentIndex to move.  It is stable from
+    run to run, so tables can be compared across runs.
+    """
+    while len(_agentKeys) <= agentIndex:
+        _agentKeys.append(random.Random(len(_agentKeys) + 1).getrandbits(64))
+    return gameState.getZobristHash() ^ _agentKeys[agentIndex]
+
+class TranspositionEntry(object):
+    __slots__ = ('key', 'depth', 'value', 'bound', 'bestMove', 'generation')
+
+    def __init__(self, key, depth, value, bound, bestMove, generation):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.bestMove = bestMove
+        self.generation = generation
+
+class TranspositionTable(object):
+    """
+    A fixed-size table of TranspositionEntries.  When two keys share a slot
+    the entry from an earlier search (see newSearch) or, within a search, the
+    shallower one is replaced; a deeper entry from the current search is
+    kept.  Hit statistics are kept in probes, hits, stores, replaced (an
+    entry for another key overwritten) and rejected (a store dropped to keep
+    a deeper entry).
+    """
+    def __init__(self, memoryBudget=16 * 1024 * 1024):
+        self.size = max(1, memoryBudget // ENTRY_BYTES)
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.resetStats()
+
+    def resetStats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replaced = 0
+        self.rejected = 0
+
+    def newSearch(self):
+        "Marks the entries stored so far as old, to be replaced first"
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.resetStats()
+
+    def probe(self, key):
+        "Returns the entry for key, or None"
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def lookup(self, key, depth, alpha=-float('inf'), beta=float('inf')):
+        """
+        Returns the stored value of key if it was searched at least depth
+        deep and its bound settles the (alpha, beta) window, and else None.
+        """
+        entry = self.probe(key)
+        if entry is None or entry.depth < depth:
+            return None
+        if entry.bound == EXACT:
+            return entry.value
+        if entry.bound == LOWER_BOUND and entry.value >= beta:
+            return entry.value
+        if entry.bound == UPPER_BOUND and entry.value <= alpha:
+            return entry.value
+        return None
+
+    def bestMove(self, key):
+        "The best move stored for key (at any depth), to be tried first, or None"
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            return entry.bestMove
+        return None
+
+    def store(self, key, depth, value, bound=EXACT, bestMove=None):
+        self.stores += 1
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is None:
+            self.slots[index] = TranspositionEntry(key, depth, value, bound, bestMove, self.generation)
+            return
+        if entry.generation == self.generation and depth < entry.depth:
+            self.rejected += 1
+            return
+        if entry.key != key:
+            self.replaced += 1
+        elif bestMove is None:
+            bestMove = entry.bestMove # keep the move ordering hint
+        entry.key = key
+        entry.depth = depth
+        entry.value = value
+        entry.bound = bound
+        entry.bestMove = bestMove
+        entry.generation = self.generation
+
+    def hitRate(self):
+        if self.probes == 0:
+            return 0.0
+        return float(self.hits) / self.probes
+
+    def __len__(self):
+        return len([entry for entry in self.slots if entry is not None])
+
+    def __str__(self):
+        return ('%d/%d slots used, %d probes, hit rate %.1f%%, %d stores, %d replaced, %d rejected'
+                % (len(self), self.size, self.probes, 100 * self.hitRate(), self.stores,
+                   self.replaced, self.rejected))
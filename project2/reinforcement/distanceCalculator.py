@@ -0,0 +1,363 @@
+# distanceCalculator.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+# 
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+This file contains a Distancer object which computes and 
+caches the shortest path between any two points in the maze. It 
+returns a Manhattan distance between two points if the maze distance
+has not yet been calculated. 
+
+Example:
+distancer = Distancer(gameState.data.layout)
+distancer.getDistance( (1,1), (10,10) )
+
+The distances themselves live in a MazeDistances table, which can also be
+used directly when exact distances are needed right away:
+getMazeDistances(gameState.getWalls()).getDistance( (1,1), (10,10) )
+
+Tables can also be saved to an on-disk cache (see DISTANCE_CACHE_DIR), so
+later runs and parallel workers on the same layout load them instead of
+recomputing them.
+
+The Distancer object also serves as an example of sharing data 
+safely among agents via a global dictionary (distanceMap), 
+and performing asynchronous computation via threads. These
+examples may help you in designing your own objects, but you
+shouldn't need to modify the Distancer code in order to use its
+distances.
+"""
+
+import threading, sys, time, random
+import array, hashlib, os, struct, tempfile
+
+class Distancer:
+  def __init__(self, layout, background=True, default=10000):
+    """
+    Initialize with Distancer(layout).  Changing default is unnecessary.
+    
+    This will start computing maze distances in the background and use them
+    as soon as they are ready.  In the meantime, it returns manhattan distance.
+    
+    To compute all maze distances on initialization, set background=False
+    """
+    self._distances = None
+    self.default = default
+    
+    # Start computing distances in the background; when the dc finishes,
+    # it will fill in self._distances for us.
+    dc = DistanceCalculator()
+    dc.setAttr(layout, self)
+    dc.setDaemon(True)
+    if background:
+      dc.start()
+    else:
+      dc.run()
+    
+  def getDistance(self, pos1, pos2):
+    """
+    The getDistance function is the only one you'll need after you create the object.
+    """
+    if self._distances == None:
+      return manhattanDistance(pos1, pos2)
+    if isInt(pos1) and isInt(pos2):
+      return self.getDistanceOnGrid(pos1, pos2)
+    pos1Grids = getGrids2D(pos1)
+    pos2Grids = getGrids2D(pos2)
+    bestDistance = self.default
+    for pos1Snap, snap1Distance in pos1Grids:
+      for pos2Snap, snap2Distance in pos2Grids:
+        gridDistance = self.getDistanceOnGrid(pos1Snap, pos2Snap)
+        distance = gridDistance + snap1Distance + snap2Distance
+        if bestDistance > distance:
+          bestDistance = distance
+    return bestDistance
+
+  def getDistanceOnGrid(self, pos1, pos2):
+    if pos1 in self._distances and pos2 in self._distances:
+      return self._distances.getDistance(pos1, pos2)
+    else:
+      raise Exception("Positions not in grid: " + str((pos1, pos2)))
+
+  def isReadyForMazeDistance(self):
+    return self._distances != None
+
+def manhattanDistance(x, y ):
+  return abs( x[0] - y[0] ) + abs( x[1] - y[1] )
+
+def isInt(pos):
+  x, y = pos
+  return x == int(x) and y == int(y)
+
+def getGrids2D(pos):
+  grids = []
+  for x, xDistance in getGrids1D(pos[0]):
+    for y, yDistance in getGrids1D(pos[1]):
+      grids.append(((x, y), xDistance + yDistance))
+  return grids
+  
+def getGrids1D(x):
+  intX = int(x)
+  if x == int(x):
+    return [(x, 0)]
+  return [(intX, x-intX), (intX+1, intX+1-x)]
+  
+##########################################
+# MACHINERY FOR COMPUTING MAZE DISTANCES #
+##########################################
+
+distanceMap = {}
+distanceMapSemaphore = threading.Semaphore(1)
+distanceThread = None
+
+def waitOnDistanceCalculator(t):
+  global distanceThread
+  if distanceThread != None:
+    time.sleep(t)
+
+class DistanceCalculator(threading.Thread):
+  def setAttr(self, layout, distancer, default = 10000):
+    self.layout = layout
+    self.distancer = distancer
+    self.default = default
+  
+  def run(self):
+    global distanceMap, distanceThread
+    distanceMapSemaphore.acquire()
+
+    if self.layout.walls not in distanceMap:
+      if distanceThread != None: raise Exception('Multiple distance threads')
+      distanceThread = self
+
+      distances = computeDistances(self.layout)
+      print >>sys.stdout, '[Distancer]: Switching to maze distances' 
+
+      distanceMap[self.layout.walls] = distances
+      distanceThread = None
+    else:
+      distances = distanceMap[self.layout.walls]
+
+    distanceMapSemaphore.release()
+    self.distancer._distances = distances  
+
+def computeDistances(layout):
+    return loadOrComputeDistances(layout.walls)
+
+def getDistanceOnGrid(distances, pos1, pos2):
+    if pos1 in distances and pos2 in distances:
+      return distances.getDistance(pos1, pos2)
+    return 100000
+
+UNREACHABLE = sys.maxint # distance reported between disconnected cells
+
+class MazeDistances:
+  """
+  Exact maze distances between every pair of open cells of a wall Grid.
+
+  Open cells are numbered in walls.asList(False) order, and one BFS from
+  each of them fills a flat array where entry (i * numCells + j) is the
+  distance from cell i to cell j, so getDistance is two dict lookups and an
+  array read.  Use getMazeDistances to share one table per wall layout.
+  """
+  def __init__(self, walls, table=None):
+    """
+    Computes the table for walls, unless a previously computed one (such as
+    the one read by loadMazeDistances) is passed in.
+    """
+    self.cells = walls.asList(False)
+    self.cellIds = dict((cell, i) for i, cell in enumerate(self.cells))
+    self.numCells = n = len(self.cells)
+    self._byDistance = {}
+    if table is not None:
+      self.table = table
+      return
+
+    neighbors = []
+    for x, y in self.cells:
+      adjacent = [(x, y+1), (x, y-1), (x+1, y), (x-1, y)]
+      neighbors.append([self.cellIds[cell] for cell in adjacent if cell in self.cellIds])
+
+    self.table = array.array('i', [-1]) * (n * n)
+    table = self.table
+    for source in range(n):
+      row = source * n
+      table[row + source] = 0
+      frontier = [source]
+      for node in frontier: # frontier grows while we walk it, giving BFS order
+        nextDist = table[row + node] + 1
+        for other in neighbors[node]:
+          if table[row + other] < 0:
+            table[row + other] = nextDist
+            frontier.append(other)
+
+  def getDistance(self, pos1, pos2):
+    """
+    Returns the maze distance between two open cells, or UNREACHABLE if no
+    path connects them.
+    """
+    dist = self.table[self.cellIds[pos1] * self.numCells + self.cellIds[pos2]]
+    if dist < 0:
+      return UNREACHABLE
+    return dist
+
+  def cellsByDistance(self, pos):
+    """
+    Returns the cells reachable from pos, nearest first, so a search for the
+    nearest cell of some kind can stop at the first match.  Each order is
+    sorted on first use and kept as an array of cell numbers (see cells).
+    """
+    order = self._byDistance.get(pos)
+    if order is None:
+      row = self.cellIds[pos] * self.numCells
+      table = self.table
+      reachable = [cell for cell in range(self.numCells) if table[row + cell] >= 0]
+      reachable.sort(key=lambda cell: table[row + cell])
+      order = self._byDistance[pos] = array.array('i', reachable)
+    return order
+
+  def __contains__(self, pos):
+    return pos in self.cellIds
+
+_distancesByWallsId = {}
+
+def getMazeDistances(walls):
+  """
+  Returns the MazeDistances for a wall Grid, computing them only the first
+  time a given wall layout is seen.  Tables are shared through distanceMap,
+  so every agent and heuristic in the process reuses the same one.
+  """
+  # Layouts hand out the same walls object on every getWalls() call, so
+  # check by identity before paying for a full Grid hash
+  entry = _distancesByWallsId.get(id(walls))
+  if entry is not None and entry[0] is walls:
+    return entry[1]
+
+  distanceMapSemaphore.acquire()
+  try:
+    if walls not in distanceMap:
+      distanceMap[walls] = loadOrComputeDistances(walls)
+    distances = distanceMap[walls]
+  finally:
+    distanceMapSemaphore.release()
+  _distancesByWallsId[id(walls)] = (walls, distances)
+  return distances
+  
+
+#########################################
+# ON-DISK CACHE OF MAZE DISTANCE TABLES #
+#########################################
+
+# Directory holding saved tables.  The disk cache is off unless
+# PACMAN_DISTANCE_CACHE names one; pick a directory only you can write to,
+# as a table read from it is trusted once its header matches the layout.
+DISTANCE_CACHE_DIR = os.environ.get('PACMAN_DISTANCE_CACHE', '')
+
+# A cache file is this header (magic, SHA-1 of the walls, width, height,
+# number of open cells) followed by the table as little-endian int32s, so it
+# can be read as is.
+_CACHE_MAGIC = 'PMDIST02'
+_CACHE_HEADER = struct.Struct('<8s20sIII')
+
+def wallsDigest(walls):
+  "The SHA-1 digest of a wall layout, which names and checks its cache file"
+  return hashlib.sha1(repr(walls.packBits())).digest()
+
+def getDistanceCachePath(walls):
+  """
+  Returns the cache file for a wall layout, named by a hash of its walls, or
+  None if the disk cache is turned off.
+  """
+  if not DISTANCE_CACHE_DIR:
+    return None
+  return os.path.join(DISTANCE_CACHE_DIR, wallsDigest(walls).encode('hex') + '.dist')
+
+def saveMazeDistances(distances, walls, path):
+  """
+  Writes distances to path.  The file is written under a temporary name and
+  then renamed, so concurrent readers never see a partial table.
+  """
+  directory = os.path.dirname(path)
+  if not os.path.isdir(directory):
+    os.makedirs(directory)
+  table = distances.table
+  if sys.byteorder != 'little':
+    table = array.array('i', table)
+    table.byteswap()
+  handle, tempPath = tempfile.mkstemp(dir=directory)
+  try:
+    os.write(handle, _CACHE_HEADER.pack(_CACHE_MAGIC, wallsDigest(walls), walls.width, walls.height,
+                                        distances.numCells))
+    os.write(handle, table.tostring())
+  finally:
+    os.close(handle)
+  os.chmod(tempPath, 0644) # mkstemp files are private; other workers need to read it
+  try:
+    os.rename(tempPath, path)
+  except OSError:
+    os.remove(tempPath) # e.g. another worker saved the same table first
+    raise
+
+def loadMazeDistances(walls, path):
+  """
+  Reads a table written by saveMazeDistances and returns it as
+  MazeDistances for walls, or None if the file is missing, belongs to
+  another user, or its header does not match the layout (walls digest,
+  size and number of open cells).  After the header is checked, the table
+  is read straight from the file into its array, with no intermediate
+  string.
+  """
+  try:
+    cacheFile = open(path, 'rb')
+  except IOError:
+    return None
+  try:
+    status = os.fstat(cacheFile.fileno())
+    if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+      return None
+    header = cacheFile.read(_CACHE_HEADER.size)
+    if len(header) != _CACHE_HEADER.size:
+      return None
+    magic, digest, width, height, numCells = _CACHE_HEADER.unpack(header)
+    numOpen = len(walls.asList(False))
+    if (magic != _CACHE_MAGIC or digest != wallsDigest(walls)
+        or (width, height) != (walls.width, walls.height) or numCells != numOpen
+        or status.st_size != _CACHE_HEADER.size + 4 * numCells * numCells):
+      return None
+    table = array.array('i')
+    try:
+      table.fromfile(cacheFile, numCells * numCells)
+    except EOFError: # truncated since the size was checked
+      return None
+  finally:
+    cacheFile.close()
+  if sys.byteorder != 'little':
+    table.byteswap()
+  return MazeDistances(walls, table)
+
+def loadOrComputeDistances(walls):
+  """
+  Returns the MazeDistances for walls from the disk cache, computing and
+  saving them there first if needed.  A cache that cannot be written only
+  costs the recomputation.
+  """
+  path = getDistanceCachePath(walls)
+  if path is None:
+    return MazeDistances(walls)
+  distances = loadMazeDistances(walls, path)
+  if distances is None:
+    distances = MazeDistances(walls)
+    try:
+      saveMazeDistances(distances, walls, path)
+    except (IOError, OSError):
+      pass
+  return distances
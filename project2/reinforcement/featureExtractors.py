@@ -15,6 +15,7 @@
 "Feature extractors for Pacman game states"
 
 from game import Directions, Actions
+from distanceCalculator import getMazeDistances
 import util
 
 class FeatureExtractor:
@@ -44,22 +45,18 @@ class CoordinateExtractor(FeatureExtractor):
 def closestFood(pos, food, walls):
     """
     closestFood -- this is similar to the function that we have
-    worked on in the search project; here its all in one place
+    worked on in the search project; here the maze distances come
+    from a table computed once per layout (see distanceCalculator.py),
+    and the cells are tried nearest first until one has food
     """
-    fringe = [(pos[0], pos[1], 0)]
-    expanded = set()
-    while fringe:
-        pos_x, pos_y, dist = fringe.pop(0)
-        if (pos_x, pos_y) in expanded:
-            continue
-        expanded.add((pos_x, pos_y))
-        # if we find a food at this location then exit
-        if food[pos_x][pos_y]:
-            return dist
-        # otherwise spread out from the location to its neighbours
-        nbrs = Actions.getLegalNeighbors((pos_x, pos_y), walls)
-        for nbr_x, nbr_y in nbrs:
-            fringe.append((nbr_x, nbr_y, dist+1))
+    distances = getMazeDistances(walls)
+    if pos not in distances:
+        return None
+    cells = distances.cells
+    for cell in distances.cellsByDistance(pos):
+        x, y = cells[cell]
+        if food[x][y]:
+            return distances.getDistance(pos, (x, y))
     # no food found
     return None
 
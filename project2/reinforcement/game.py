@@ -21,7 +21,7 @@
 # For more info, see http://inst.eecs.berkeley.edu/~cs188/sp09/pacman.html
 
 from util import *
-import time, os
+import time, os, random
 import traceback
 import sys
 
@@ -193,14 +193,14 @@ class Grid:
         return self.data == other.data
 
     def __hash__(self):
-        # return hash(str(self))
-        base = 1
+        "The Zobrist hash of the True cells (see ZobristKeys)"
+        keys = ZobristKeys.forBoard(self.width, self.height).cells
         h = 0
-        for l in self.data:
-            for i in l:
-                if i:
-                    h += base
-                base *= 2
+        for x, column in enumerate(self.data):
+            columnKeys = keys[x]
+            for y, value in enumerate(column):
+                if value:
+                    h ^= columnKeys[y]
         return hash(h)
 
     def copy(self):
@@ -280,6 +280,73 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class ZobristKeys(object):
+    """
+    Random 64-bit keys for the cells of a width x height board.  A Zobrist
+    hash is the xor of the keys of the occupied cells, so adding or
+    removing one item updates it with a single xor.  The keys only depend
+    on the board size, so hashes are the same in every run; use forBoard
+    to share them.
+
+    cells holds the keys of food (and of any Grid), capsules those of
+    capsules, and agentKey gives the key of an agent's position, direction
+    and scared timer.
+    """
+    def __init__(self, width, height):
+        generator = random.Random(width * 65536 + height)
+        self.cells = [[generator.getrandbits(64) for y in range(height)] for x in range(width)]
+        self.capsules = [[generator.getrandbits(64) for y in range(height)] for x in range(width)]
+        self.salt = generator.getrandbits(64)
+
+    @staticmethod
+    def forBoard(width, height):
+        if (width, height) not in _zobristKeys:
+            _zobristKeys[(width, height)] = ZobristKeys(width, height)
+        return _zobristKeys[(width, height)]
+
+    def hashGrid(self, grid):
+        "The Zobrist hash of the True cells of grid"
+        gridHash = 0
+        for x, y in grid.asList():
+            gridHash ^= self.cells[x][y]
+        return gridHash
+
+    def hashCapsules(self, capsules):
+        capsuleHash = 0
+        for x, y in capsules:
+            capsuleHash ^= self.capsules[x][y]
+        return capsuleHash
+
+    def agentKey(self, agentIndex, agentState):
+        """
+        The key of an agent's configuration and scared timer.  Positions can
+        be fractional while ghosts are scared, so instead of a table the key
+        is a 64-bit mix of the packed values.
+        """
+        configuration = agentState.configuration
+        if configuration is None:
+            return 0
+        x, y = configuration.pos
+        packed = (((agentIndex * 8192 + int(x * 2)) * 8192 + int(y * 2)) * 8
+                  + _DIRECTION_CODES.get(configuration.direction, 7)) * 1024 + agentState.scaredTimer
+        return _mix64(packed ^ self.salt)
+
+    def scoreKey(self, score):
+        # not hash(score): hash(-1) == hash(-2)
+        return _mix64(int(score * 1024) ^ self.salt ^ 0x5bd1e995)
+
+def _mix64(value):
+    "The splitmix64 finalizer: spreads value over all 64 bits"
+    value &= 0xffffffffffffffff
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & 0xffffffffffffffff
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & 0xffffffffffffffff
+    return value ^ (value >> 31)
+
+_DIRECTION_CODES = {Directions.NORTH: 0, Directions.SOUTH: 1, Directions.EAST: 2,
+                    Directions.WEST: 3, Directions.STOP: 4}
+
+_zobristKeys = {}
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -374,15 +441,23 @@ class GameStateData:
     """
     def __init__( self, prevState = None ):
         """
-        Generates a new data packet by copying information from its predecessor.
+        Generates a new data packet from its predecessor.  The food, capsules
+        and AgentStates are shared with the predecessor until they change:
+        use getAgentStateForUpdate, removeFood and removeCapsule to change
+        them, never the shared objects themselves.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates( prevState.agentStates )
+            self.food = prevState.food
+            self.capsules = prevState.capsules
+            self.agentStates = prevState.agentStates[:]
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self.numFood = prevState.numFood
+            self.foodHash = prevState.foodHash
+            self.zobrist = prevState.zobrist
+        self._ownedAgents = set()
+        self._changedAgents = []
 
         self._foodEaten = None
         self._foodAdded = None
@@ -395,6 +470,9 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
+        state.agentStates = self.copyAgentStates( self.agentStates )
+        state._ownedAgents = set( range( len( state.agentStates ) ) )
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -408,6 +486,62 @@ class GameStateData:
             copiedStates.append( agentState.copy() )
         return copiedStates
 
+    def getAgentStateForUpdate( self, agentIndex ):
+        """
+        Returns the AgentState of agentIndex for changing in place, copying it
+        first if it is still shared with the predecessor.
+        """
+        if agentIndex not in self._ownedAgents:
+            agentState = self.agentStates[agentIndex]
+            self.zobrist ^= self._zobristKeys().agentKey( agentIndex, agentState )
+            self._changedAgents.append( agentIndex )
+            self.agentStates[agentIndex] = agentState.copy()
+            self._ownedAgents.add( agentIndex )
+        return self.agentStates[agentIndex]
+
+    def updateZobrist( self ):
+        """
+        Adds the keys of the AgentStates changed since this data was made
+        from its predecessor to zobrist; GameState.generateSuccessor calls it
+        once the rules have moved the agents.
+        """
+        keys = self._zobristKeys()
+        for agentIndex in self._changedAgents:
+            self.zobrist ^= keys.agentKey( agentIndex, self.agentStates[agentIndex] )
+        self._changedAgents = []
+
+    def _zobristKeys( self ):
+        return ZobristKeys.forBoard( self.layout.width, self.layout.height )
+
+    def removeFood( self, position ):
+        """
+        Removes the food at position, copying only the column it is in, and
+        updates numFood and foodHash.
+        """
+        x, y = position
+        key = self._zobristKeys().cells[x][y]
+        self.numFood -= 1
+        self.foodHash ^= key
+        self.zobrist ^= key
+        food = self.food.shallowCopy()
+        food.data = self.food.data[:]
+        food.data[x] = food.data[x][:]
+        food.data[x][y] = False
+        self.food = food
+
+    def removeCapsule( self, position ):
+        x, y = position
+        self.zobrist ^= self._zobristKeys().capsules[x][y]
+        self.capsules = [capsule for capsule in self.capsules if capsule != position]
+
+    def zobristHash( self ):
+        """
+        A 64-bit Zobrist hash of the food, capsules, agents and score, which is
+        the same in every run.  It is updated as the rules change the state,
+        so it costs the same on any board.
+        """
+        return self.zobrist ^ self._zobristKeys().scoreKey( self.score )
+
     def __eq__( self, other ):
         """
         Allows two states to be compared.
@@ -424,13 +558,7 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return hash( self.zobristHash() )
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -489,6 +617,7 @@ class GameStateData:
         Creates an initial game state from a layout array (see layout.py).
         """
         self.food = layout.food.copy()
+        self.numFood = self.food.count()
         #self.capsules = []
         self.capsules = layout.capsules[:]
         self.layout = layout
@@ -504,6 +633,12 @@ class GameStateData:
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
 
+        keys = self._zobristKeys()
+        self.foodHash = keys.hashGrid( self.food )
+        self.zobrist = self.foodHash ^ keys.hashCapsules( self.capsules )
+        for agentIndex, agentState in enumerate( self.agentStates ):
+            self.zobrist ^= keys.agentKey( agentIndex, agentState )
+
 try:
     import boinc
     _BOINC_ENABLED = True
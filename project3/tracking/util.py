@@ -162,29 +162,74 @@ class PriorityQueue:
       in quick retrieval of the lowest-priority item in the queue. This
       data structure allows O(1) access to the lowest-priority item.
 
-      Note that this PriorityQueue does not allow you to change the priority
-      of an item.  However, you may insert the same item multiple times with
-      different priorities.
+      push() may insert the same item multiple times with different
+      priorities.  update() instead keeps at most one live entry per item:
+      a lower priority replaces the old entry, which is lazily invalidated
+      and discarded when it reaches the top of the heap.
     """
     def  __init__(self):
         self.heap = []
         self.count = 0
+        self.size = 0 # number of live entries in the heap
+        self.entryFinder = {} # key -> live entry, for items added by update()
+
+    def keyOf(self, item):
+        "Returns the key that update() uses to identify item"
+        return item
 
     def push(self, item, priority):
         # FIXME: restored old behaviour to check against old results better
         # FIXED: restored to stable behaviour
-        entry = (priority, self.count, item)
+        entry = [priority, self.count, item]
         # entry = (priority, item)
         heapq.heappush(self.heap, entry)
         self.count += 1
+        self.size += 1
+        return entry
+
+    def update(self, item, priority):
+        """
+          If item is already in the queue with a higher priority, lower its
+          priority.  If it is there with an equal or lower priority, do
+          nothing.  Otherwise push it as usual.
+        """
+        key = self.keyOf(item)
+        entry = self.entryFinder.get(key)
+        if entry is not None:
+            if entry[0] <= priority:
+                return
+            entry[2] = _REMOVED # invalidated, skipped when popped
+            self.size -= 1
+        self.entryFinder[key] = PriorityQueue.push(self, item, priority)
 
     def pop(self):
-        (_, _, item) = heapq.heappop(self.heap)
+        self._discardRemoved()
+        entry = heapq.heappop(self.heap)
+        (_, _, item) = entry
         #  (_, item) = heapq.heappop(self.heap)
+        self.size -= 1
+        if self.entryFinder:
+            key = self.keyOf(item)
+            if self.entryFinder.get(key) is entry:
+                del self.entryFinder[key]
         return item
 
+    def peek(self):
+        "Returns the lowest-priority item without removing it"
+        self._discardRemoved()
+        return self.heap[0][2]
+
+    def _discardRemoved(self):
+        while self.heap and self.heap[0][2] is _REMOVED:
+            heapq.heappop(self.heap)
+
     def isEmpty(self):
-        return len(self.heap) == 0
+        return self.size == 0
+
+    def __len__(self):
+        return self.size
+
+_REMOVED = object() # placeholder for entries invalidated by PriorityQueue.update
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
@@ -192,15 +237,28 @@ class PriorityQueueWithFunction(PriorityQueue):
     Queue and the Stack classes. This is designed for drop-in replacement for
     those two classes. The caller has to provide a priority function, which
     extracts each item's priority.
+
+    If a key function is also given, items with the same key share a single
+    entry: pushing one only replaces the queued item when its priority is
+    strictly lower (see PriorityQueue.update).
     """
-    def  __init__(self, priorityFunction):
-        "priorityFunction (item) -> priority"
+    def  __init__(self, priorityFunction, keyFunction=None):
+        "priorityFunction (item) -> priority, keyFunction (item) -> hashable key"
         self.priorityFunction = priorityFunction      # store the priority function
+        self.keyFunction = keyFunction
         PriorityQueue.__init__(self)        # super-class initializer
 
+    def keyOf(self, item):
+        if self.keyFunction is None:
+            return item
+        return self.keyFunction(item)
+
     def push(self, item):
         "Adds an item to the queue with priority from the priority function"
-        PriorityQueue.push(self, item, self.priorityFunction(item))
+        if self.keyFunction is None:
+            PriorityQueue.push(self, item, self.priorityFunction(item))
+        else:
+            self.update(item, self.priorityFunction(item))
 
 
 def manhattanDistance( xy1, xy2 ):